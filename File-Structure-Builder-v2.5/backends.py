@@ -0,0 +1,640 @@
+import errno
+import io
+import os
+import stat
+import sys
+import tarfile
+import time
+import zipfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import ctypes
+    _libc = ctypes.CDLL(None, use_errno=True)
+except (ImportError, OSError, TypeError):
+    _libc = None
+_renameat2 = getattr(_libc, "renameat2", None)
+if _renameat2 is not None:
+    _renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+# Flushes everything on one filesystem in a single call (Linux)
+_syncfs = getattr(_libc, "syncfs", None)
+if _syncfs is not None:
+    _syncfs.argtypes = [ctypes.c_int]
+
+# Extra flags that are only defined on some platforms
+O_DIRECTORY = getattr(os, "O_DIRECTORY", 0)
+O_NOFOLLOW = getattr(os, "O_NOFOLLOW", 0)
+O_BINARY = getattr(os, "O_BINARY", 0)
+# O_PATH descriptors are enough to anchor *at() calls and cheaper than a full open
+O_PATH = getattr(os, "O_PATH", os.O_RDONLY)
+
+FILE_MODE = 0o666
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+# ioctl that makes a file share another file's extents (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+# Below this a plain write is as cheap as any clone
+CLONE_MIN_SIZE = 4096
+# Most bodies a ContentStore keeps a source open for (two fds each)
+MAX_SOURCES = 32
+# O_EXCL folds the "already exists?" check into the create itself
+CREATE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | O_NOFOLLOW | O_BINARY
+
+# mknod makes an empty regular file in one syscall without opening it.
+# Only Linux allows it for unprivileged users; it is switched off for the
+# rest of the process if a filesystem refuses it.
+_use_mknod = sys.platform.startswith("linux") and hasattr(os, "mknod")
+# How FUSE, NFS and friends say they don't do mknod
+MKNOD_REFUSED = {errno.EPERM, errno.EACCES, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL}
+
+
+def create_placeholder(path: str, dir_fd=None) -> bool:
+    """Create an empty file without any Python file object; False if it exists"""
+    global _use_mknod
+    try:
+        if _use_mknod:
+            try:
+                os.mknod(path, FILE_MODE | stat.S_IFREG, dir_fd=dir_fd)
+                return True
+            except NotImplementedError:
+                _use_mknod = False
+            except OSError as error:
+                if error.errno not in MKNOD_REFUSED:
+                    raise
+                _use_mknod = False
+        os.close(os.open(path, CREATE_FLAGS, FILE_MODE, dir_fd=dir_fd))
+    except FileExistsError:
+        return False
+    return True
+
+
+def write_new_file(path: str, data: bytes, dir_fd=None) -> bool:
+    """Create a file holding ``data`` with raw os calls; False if it exists"""
+    if not data:
+        return create_placeholder(path, dir_fd)
+    try:
+        fd = os.open(path, CREATE_FLAGS, FILE_MODE, dir_fd=dir_fd)
+    except FileExistsError:
+        return False
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    return True
+
+
+def exchange_paths(first: str, second: str) -> bool:
+    """
+    Atomically swap two existing paths with renameat2(RENAME_EXCHANGE)
+
+    Returns False when the platform or filesystem can't do it, so the
+    caller can fall back to two plain renames.
+    """
+    if _renameat2 is None:
+        return False
+    if _renameat2(AT_FDCWD, os.fsencode(first), AT_FDCWD, os.fsencode(second), RENAME_EXCHANGE) == 0:
+        return True
+    err = ctypes.get_errno()
+    if err in (errno.ENOSYS, errno.EINVAL, errno.ENOTSUP):
+        return False
+    raise OSError(err, os.strerror(err), first, None, second)
+
+
+def fsync_path(path: str, dir_fd=None, is_folder: bool = True):
+    """
+    fsync a file or folder by name
+
+    Files are opened for writing, since Windows refuses to flush a
+    read-only handle; folders can only be opened read-only.
+    """
+    flags = os.O_RDONLY if is_folder else os.O_WRONLY
+    fd = os.open(path, flags | O_BINARY, dir_fd=dir_fd)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def syncfs_path(path: str, dir_fd=None) -> bool:
+    """syncfs the filesystem ``path`` is on; False where that isn't possible"""
+    if _syncfs is None:
+        return False
+    fd = os.open(path, os.O_RDONLY, dir_fd=dir_fd)
+    try:
+        if _syncfs(fd) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+    finally:
+        os.close(fd)
+    return True
+
+
+class ContentStore:
+    """
+    Content-addressed template bodies for the disk backends
+
+    The first file written with a given body becomes its source. Later
+    files with the same bytes are reflinked to it (FICLONE) or filled by
+    the kernel with copy_file_range, falling back to a plain write.
+    Either way the bytes only go through Python once. With ``hardlink``
+    they become hard links to the source instead. That saves the inode
+    too, but every copy then shares its edits.
+
+    A body only gets a source once it turns up a second time, and at most
+    MAX_SOURCES are kept, since each holds its file and folder open until
+    close(). Bodies that differ per file ({{path}}, {{stem}}) never cost one.
+    """
+
+    def __init__(self, hardlink: bool = False):
+        self.hardlink = hardlink
+        # body -> (source fd, source name, dir fd the name is relative to)
+        self._sources = {}
+        # hash() of every body written once so far
+        self._seen = set()
+        self._can_reflink = fcntl is not None
+        self._can_copy_range = hasattr(os, "copy_file_range")
+
+    def create(self, path: str, data: bytes, dir_fd=None) -> bool:
+        """Like write_new_file, but copies bytes that were written before"""
+        if not data or not (self.hardlink or len(data) >= CLONE_MIN_SIZE):
+            return write_new_file(path, data, dir_fd)
+        source = self._sources.get(data)
+        if source is None:
+            created = write_new_file(path, data, dir_fd)
+            if created:
+                key = hash(data)
+                if key not in self._seen:
+                    self._seen.add(key)
+                elif len(self._sources) < MAX_SOURCES:
+                    self._remember(path, data, dir_fd)
+            return created
+
+        src_fd, src_name, src_dir_fd = source
+        if self.hardlink:
+            try:
+                os.link(src_name, path, src_dir_fd=src_dir_fd, dst_dir_fd=dir_fd)
+                return True
+            except FileExistsError:
+                return False
+            except OSError:
+                # Link limit reached, links unsupported, ...: copy instead
+                pass
+
+        try:
+            fd = os.open(path, CREATE_FLAGS, FILE_MODE, dir_fd=dir_fd)
+        except FileExistsError:
+            return False
+        try:
+            if not self._clone(src_fd, fd, len(data)):
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        return True
+
+    def _remember(self, path: str, data: bytes, dir_fd):
+        src_fd = os.open(path, os.O_RDONLY | O_BINARY, dir_fd=dir_fd)
+        # The build may release dir_fd before this source is done with
+        src_dir_fd = os.dup(dir_fd) if dir_fd is not None else None
+        if self._sources.setdefault(data, (src_fd, path, src_dir_fd))[0] != src_fd:
+            # Another thread registered the same body first
+            os.close(src_fd)
+            if src_dir_fd is not None:
+                os.close(src_dir_fd)
+
+    def _clone(self, src_fd: int, fd: int, size: int) -> bool:
+        if self._can_reflink:
+            try:
+                fcntl.ioctl(fd, FICLONE, src_fd)
+                return True
+            except OSError:
+                # Filesystem without reflinks: don't ask again
+                self._can_reflink = False
+        if self._can_copy_range:
+            try:
+                copied = 0
+                while copied < size:
+                    done = os.copy_file_range(src_fd, fd, size - copied, copied, copied)
+                    if not done:
+                        break
+                    copied += done
+                if copied == size:
+                    return True
+                os.ftruncate(fd, 0)
+            except OSError:
+                self._can_copy_range = False
+        return False
+
+    def close(self):
+        for src_fd, _, src_dir_fd in self._sources.values():
+            os.close(src_fd)
+            if src_dir_fd is not None:
+                os.close(src_dir_fd)
+        self._sources.clear()
+        self._seen.clear()
+
+
+class Backend:
+    """
+    Where a build plan is materialised.
+
+    The executor walks the plan parents-first and talks to the backend in
+    terms of opaque directory handles: ``open_root`` gives the handle of the
+    base folder, ``mkdir`` returns the handle of a child folder, and every
+    handle is passed to ``release`` once its subtree is finished.
+    """
+
+    def open_root(self, base_path: str):
+        """Make sure the base folder exists and return its handle"""
+        raise NotImplementedError
+
+    def mkdir(self, parent, name: str):
+        """Create folder ``name`` in ``parent``; return (handle, created)"""
+        raise NotImplementedError
+
+    def create_file(self, parent, name: str, data: bytes = b'') -> bool:
+        """Create file ``name`` holding ``data`` in ``parent`` unless it exists; return created"""
+        raise NotImplementedError
+
+    def open_dir(self, parent, name: str):
+        """Handle of folder ``name`` that is already in ``parent``"""
+        return self.mkdir(parent, name)[0]
+
+    def listdir(self, handle):
+        """
+        Snapshot of an existing folder as {name: is_folder}, read once
+
+        None means the backend can't list cheaply and every entry is
+        checked by its own create call instead.
+        """
+        return None
+
+    def fsync_file(self, parent, name: str):
+        """Make the contents of file ``name`` in ``parent`` durable"""
+
+    def fsync_dir(self, handle):
+        """Make the entries of folder ``handle`` durable"""
+
+    def can_fsync_dirs(self) -> bool:
+        """Whether fsync_dir() really syncs anything"""
+        return True
+
+    def can_syncfs(self) -> bool:
+        """Whether syncfs() covers a whole build in one call"""
+        return True
+
+    def syncfs(self, handle):
+        """Flush the whole filesystem ``handle`` is on"""
+
+    def release(self, handle):
+        """The subtree under ``handle`` is done"""
+
+    def path_handles(self):
+        """
+        This backend with handles that hold no file descriptor, for builds
+        that keep too many folders open at once (itself if its handles
+        never hold one)
+        """
+        return self
+
+    def close(self):
+        """The whole build is done"""
+
+
+class DiskBackend(Backend):
+    """A real filesystem; identical file bodies go through a ContentStore"""
+
+    def __init__(self, hardlink: bool = False):
+        self.store = ContentStore(hardlink)
+
+    def can_syncfs(self) -> bool:
+        return _syncfs is not None
+
+    def close(self):
+        self.store.close()
+
+
+class PathBackend(DiskBackend):
+    """Handles are full paths; works on every platform"""
+
+    def open_root(self, base_path: str):
+        os.makedirs(base_path, exist_ok=True)
+        return base_path
+
+    def mkdir(self, parent, name: str):
+        path = os.path.join(parent, name)
+        try:
+            os.mkdir(path)
+            return path, True
+        except FileExistsError:
+            if not os.path.isdir(path):
+                raise
+            return path, False
+
+    def create_file(self, parent, name: str, data: bytes = b'') -> bool:
+        return self.store.create(os.path.join(parent, name), data)
+
+    def open_dir(self, parent, name: str):
+        return os.path.join(parent, name)
+
+    def fsync_file(self, parent, name: str):
+        fsync_path(os.path.join(parent, name), is_folder=False)
+
+    def fsync_dir(self, handle):
+        # Windows can't open folders for fsync; NTFS journals them anyway
+        if sys.platform != "win32":
+            fsync_path(handle)
+
+    def can_fsync_dirs(self) -> bool:
+        return sys.platform != "win32"
+
+    def syncfs(self, handle):
+        syncfs_path(handle)
+
+    def listdir(self, handle):
+        with os.scandir(handle) as entries:
+            return {entry.name: entry.is_dir() for entry in entries}
+
+
+class DirFdBackend(DiskBackend):
+    """
+    Handles are directory file descriptors and children are created with
+    mkdirat/openat semantics (``dir_fd=``), so the kernel never walks the
+    full path again. Folders are reopened with O_NOFOLLOW, which also stops a
+    path component swapped for a symlink mid-build from redirecting the rest.
+    """
+
+    @staticmethod
+    def available() -> bool:
+        return (
+            os.mkdir in os.supports_dir_fd
+            and os.open in os.supports_dir_fd
+            and os.scandir in os.supports_fd
+            and bool(O_DIRECTORY)
+        )
+
+    def open_root(self, base_path: str):
+        os.makedirs(base_path, exist_ok=True)
+        return os.open(base_path, O_PATH | O_DIRECTORY)
+
+    def mkdir(self, parent, name: str):
+        try:
+            os.mkdir(name, dir_fd=parent)
+            created = True
+        except FileExistsError:
+            created = False
+        # Raises NotADirectoryError/OSError if a file or symlink is in the way
+        return os.open(name, O_PATH | O_DIRECTORY | O_NOFOLLOW, dir_fd=parent), created
+
+    def create_file(self, parent, name: str, data: bytes = b'') -> bool:
+        return self.store.create(name, data, dir_fd=parent)
+
+    def open_dir(self, parent, name: str):
+        return os.open(name, O_PATH | O_DIRECTORY | O_NOFOLLOW, dir_fd=parent)
+
+    def fsync_file(self, parent, name: str):
+        fsync_path(name, dir_fd=parent, is_folder=False)
+
+    # O_PATH descriptors can't be synced themselves, so these reopen "."
+    def fsync_dir(self, handle):
+        fsync_path(".", dir_fd=handle)
+
+    def syncfs(self, handle):
+        syncfs_path(".", dir_fd=handle)
+
+    def listdir(self, handle):
+        # O_PATH descriptors can't be read, so list through a real one
+        fd = os.open(".", os.O_RDONLY | O_DIRECTORY, dir_fd=handle)
+        try:
+            with os.scandir(fd) as entries:
+                return {entry.name: entry.is_dir(follow_symlinks=False) for entry in entries}
+        finally:
+            os.close(fd)
+
+    def release(self, handle):
+        os.close(handle)
+
+    def path_handles(self):
+        backend = PathBackend()
+        # Same store, so bodies written so far are still cloned
+        backend.store = self.store
+        return backend
+
+
+class MemoryFile:
+    """A file in a MemoryBackend: just its bytes"""
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes = b''):
+        self.data = bytearray(data)
+
+
+class MemoryDir:
+    """A folder in a MemoryBackend: name -> MemoryDir or MemoryFile"""
+    __slots__ = ("children",)
+
+    def __init__(self):
+        self.children = {}
+
+
+class MemoryBackend(Backend):
+    """
+    In-memory filesystem: nested dicts of MemoryDir/MemoryFile entries
+
+    Runs the same plans as the disk backends at memory speed, for previews
+    of what a build will really produce and for exercising the builder
+    without temp folders. Handles are the MemoryDir objects themselves.
+    Reuse one instance to build several specs into the same tree.
+    """
+
+    def __init__(self):
+        self.root = MemoryDir()
+
+    def _folder(self, path: str, create: bool = False):
+        node = self.root
+        for name in path.replace(os.sep, "/").split("/"):
+            if name in ("", "."):
+                continue
+            child = node.children.get(name)
+            if child is None and create:
+                child = node.children[name] = MemoryDir()
+            if not isinstance(child, MemoryDir):
+                raise (NotADirectoryError if child else FileNotFoundError)(path)
+            node = child
+        return node
+
+    def open_root(self, base_path: str):
+        return self._folder(base_path, create=True)
+
+    def mkdir(self, parent, name: str):
+        child = parent.children.get(name)
+        if child is None:
+            child = parent.children[name] = MemoryDir()
+            return child, True
+        if not isinstance(child, MemoryDir):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), name)
+        return child, False
+
+    def create_file(self, parent, name: str, data: bytes = b'') -> bool:
+        if name in parent.children:
+            return False
+        parent.children[name] = MemoryFile(data)
+        return True
+
+    # listdir stays None: every lookup is already a dict hit
+
+    def exists(self, path: str) -> bool:
+        head, _, name = path.replace(os.sep, "/").rstrip("/").rpartition("/")
+        try:
+            return name in self._folder(head).children
+        except OSError:
+            return False
+
+    def read(self, path: str) -> bytes:
+        """Contents of the file at ``path``"""
+        head, _, name = path.replace(os.sep, "/").rpartition("/")
+        entry = self._folder(head).children.get(name)
+        if not isinstance(entry, MemoryFile):
+            raise (IsADirectoryError if entry else FileNotFoundError)(path)
+        return bytes(entry.data)
+
+    def walk(self, path: str = ""):
+        """(depth, name, is_folder) for everything below ``path``, parents first"""
+        stack = [(1, iter(self._folder(path).children.items()))]
+        while stack:
+            depth, entries = stack[-1]
+            for name, entry in entries:
+                is_folder = isinstance(entry, MemoryDir)
+                yield depth, name, is_folder
+                if is_folder and entry.children:
+                    stack.append((depth + 1, iter(entry.children.items())))
+                break
+            else:
+                stack.pop()
+
+
+# Archive suffix -> tarfile stream mode (None for zip)
+ARCHIVE_FORMATS = {
+    "tar": "w|",
+    "tar.gz": "w|gz",
+    "tgz": "w|gz",
+    "tar.bz2": "w|bz2",
+    "tar.xz": "w|xz",
+    "tar.zst": "w|",
+    "zip": None,
+}
+
+
+def archive_format(path: str) -> str:
+    """Archive format from a file name, tar when nothing matches"""
+    for fmt in sorted(ARCHIVE_FORMATS, key=len, reverse=True):
+        if path.lower().endswith("." + fmt):
+            return fmt
+    return "tar"
+
+
+class ArchiveBackend(Backend):
+    """
+    Streams the build into a tar or zip archive instead of the filesystem
+
+    Every entry gets a synthetic header (fixed mode and owner, one mtime
+    for the whole build) and is written once, in plan order, so the output
+    can be a pipe: pass "-" for stdout. Handles are the archive paths of
+    folders. Build with one worker, the archive is written sequentially.
+    """
+
+    def __init__(self, output, fmt: str = None):
+        named = isinstance(output, str)
+        if not fmt:
+            fmt = archive_format(output) if named and output != "-" else "tar"
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format: {fmt}")
+        if fmt == "tar.zst" and zstandard is None:
+            raise RuntimeError("zstd archives need the zstandard package")
+        self._own = named and output != "-"
+        if self._own:
+            self._file = open(output, "wb")
+        else:
+            self._file = sys.stdout.buffer if named else output
+
+        stream = self._file
+        self._zstd = None
+        if fmt == "tar.zst":
+            self._zstd = stream = zstandard.ZstdCompressor().stream_writer(stream)
+        self._tar = self._zip = None
+        if fmt == "zip":
+            self._zip = zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED)
+        else:
+            self._tar = tarfile.open(fileobj=stream, mode=ARCHIVE_FORMATS[fmt])
+        self.mtime = int(time.time())
+        self._date_time = time.localtime(self.mtime)[:6]
+
+    def _add(self, path: str, is_folder: bool, data: bytes = b''):
+        if self._tar is not None:
+            info = tarfile.TarInfo(path)
+            info.mtime = self.mtime
+            if is_folder:
+                info.type = tarfile.DIRTYPE
+                info.mode = 0o755
+                self._tar.addfile(info)
+            else:
+                info.mode = 0o644
+                info.size = len(data)
+                self._tar.addfile(info, io.BytesIO(data) if data else None)
+        elif is_folder:
+            info = zipfile.ZipInfo(path + "/", self._date_time)
+            info.external_attr = (stat.S_IFDIR | 0o755) << 16 | 0x10
+            self._zip.writestr(info, b'')
+        else:
+            info = zipfile.ZipInfo(path, self._date_time)
+            info.external_attr = (stat.S_IFREG | 0o644) << 16
+            info.compress_type = zipfile.ZIP_DEFLATED if data else zipfile.ZIP_STORED
+            self._zip.writestr(info, data)
+
+    def open_root(self, base_path: str):
+        # base_path becomes the top folder inside the archive ("" or "." for none)
+        root = base_path.replace(os.sep, "/").strip("/")
+        if root in ("", "."):
+            return ""
+        self._add(root, True)
+        return root
+
+    def mkdir(self, parent, name: str):
+        path = f"{parent}/{name}" if parent else name
+        self._add(path, True)
+        return path, True
+
+    def create_file(self, parent, name: str, data: bytes = b'') -> bool:
+        self._add(f"{parent}/{name}" if parent else name, False, data)
+        return True
+
+    def close(self):
+        if self._tar is not None:
+            self._tar.close()
+        else:
+            self._zip.close()
+        if self._zstd is not None:
+            self._zstd.flush(zstandard.FLUSH_FRAME)
+        if self._own:
+            self._file.close()
+        else:
+            self._file.flush()
+
+
+def default_backend(hardlink: bool = False) -> Backend:
+    """The fastest backend this platform supports"""
+    if DirFdBackend.available():
+        return DirFdBackend(hardlink)
+    return PathBackend(hardlink)
@@ -1,148 +1,1095 @@
+import argparse
+import asyncio
 import os
-import re
+import queue
+import shutil
+import sys
+import threading
+import time
+import uuid
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from backends import ARCHIVE_FORMATS, ArchiveBackend, PathBackend, create_placeholder, default_backend, exchange_paths, fsync_path
+from journal import JOURNAL_EVERY, Journal
+from manifest import Manifest, relative_paths, spec_digest
+from templates import FILE_TEMPLATES, TemplateSet
+from throttle import RateLimiter, ThrottledBackend, run_in_thread
+from structure_parser import PathNode, StructureTree, cached_parse, iter_structure, iter_structure_file
 
 def clean_structure_text(structure_text: str):
     """Clean AI-generated structure text by removing comments and descriptions"""
-    lines = structure_text.splitlines()
-    cleaned_lines = []
+    return '\n'.join(cached_parse(structure_text).lines)
+
+def count_structure_items(structure_text: str):
+    """Count folders and files in structure"""
+    tree = cached_parse(structure_text)
+    return tree.folders, tree.files
+
+class BuildResult:
+    """Totals of one build"""
+    __slots__ = ("folders", "files", "existing", "removed", "timings")
     
-    for line in lines:
-        # Remove HTML entities
-        line = line.replace('&lt;', '<').replace('&gt;', '>')
-        
-        # Remove comments (everything after <--, //, #)
-        line = re.sub(r'\s*(<--|//|#).*$', '', line)
+    def __init__(self):
+        self.folders = 0      # folders created
+        self.files = 0        # files created
+        self.existing = 0     # entries that were already there
+        self.removed = 0      # stale entries deleted by a sync
+        self.timings = {}     # sync stage -> seconds spent in it
+    
+    @property
+    def total(self):
+        return self.folders + self.files + self.existing
+    
+    def count(self, is_folder: bool, created: bool):
+        if not created:
+            self.existing += 1
+        elif is_folder:
+            self.folders += 1
+        else:
+            self.files += 1
+    
+    def merge(self, other):
+        self.folders += other.folders
+        self.files += other.files
+        self.existing += other.existing
+        for stage, seconds in other.timings.items():
+            self.add_time(stage, seconds)
+    
+    def add_time(self, stage: str, seconds: float):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+# Entries between two progress events of the serial and async engines
+PROGRESS_EVERY = 500
+
+class BuildProgress:
+    """
+    One progress event of a running build
+
+    ``done`` of the plan's ``total`` entries are handled, so ``done`` is
+    also the index of the next entry in plan order. The counts are the
+    running totals so far; ``error`` is only set on the last event of a
+    build that failed.
+    """
+    __slots__ = ("done", "total", "folders", "files", "existing", "error")
+    
+    def __init__(self, total: int, result: BuildResult, error=None):
+        self.done = result.total
+        self.total = total
+        self.folders = result.folders
+        self.files = result.files
+        self.existing = result.existing
+        self.error = error
+    
+    @property
+    def fraction(self):
+        return self.done / self.total if self.total else 1.0
+
+def _report(progress, total: int, result: BuildResult, error=None):
+    if progress is not None:
+        progress(BuildProgress(total, result, error))
+
+class BuildPlan:
+    """
+    Everything a build will do, worked out before touching the disk
+
+    ``order`` lists every trie node with parents ahead of their children,
+    so each folder needs exactly one mkdir and no ancestor is ever created
+    or checked twice.
+    """
+    __slots__ = ("trie", "order", "dirs", "files", "max_depth", "contents")
+    
+    def __init__(self, trie, templates=None):
+        self.trie = trie
+        self.order = list(trie.walk())
+        self.dirs = trie.folders
+        self.files = trie.files
+        self.max_depth = max((node.depth for node in self.order), default=0)
+        # Templates compiled once for the whole build
+        if templates and not isinstance(templates, TemplateSet):
+            templates = TemplateSet(templates)
+        self.contents = templates or None
+    
+    def data_for(self, node) -> bytes:
+        """What the file for ``node`` is created with (empty for folders)"""
+        if self.contents is None or node.is_folder:
+            return b''
+        return self.contents.render(node.name, lambda: template_path(node))
+    
+    def levels(self):
+        """Nodes grouped by depth; level ``i`` only needs folders from level ``i - 1``"""
+        levels = [[] for _ in range(self.max_depth)]
+        for node in self.order:
+            levels[node.depth - 1].append(node)
+        return levels
+
+def template_path(node) -> str:
+    """Path of a node inside the project as templates see it ("src/app.py")"""
+    names = []
+    while node.parent is not None:
+        names.append(node.name)
+        node = node.parent
+    return "/".join(reversed(names))
+
+def load_tree(structure):
+    """Accept spec text or an already parsed StructureTree"""
+    if isinstance(structure, StructureTree):
+        return structure
+    return cached_parse(structure)
+
+def plan_build(structure, templates=None):
+    """
+    Planning phase: parse (or reuse) the structure and order its entries
+
+    ``templates`` is a TemplateSet, or a map from an extension (".py")
+    to the text new files get.
+    """
+    return BuildPlan(load_tree(structure).trie(), templates)
+
+# Threads used by the GUIs; metadata syscalls release the GIL, so more
+# threads than cores still pays off on fast or networked filesystems
+BUILD_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+# Smallest batch of nodes handed to one worker task
+MIN_CHUNK = 64
+# Most folder handles the threaded engine keeps open at once; a tree with
+# wider levels than this is built with path handles instead of fds
+MAX_OPEN_HANDLES = 128
+
+def place_node(backend, node, parent, listing, data: bytes = b''):
+    """
+    Create one planned node inside ``parent``; returns (handle, listing, created)
+
+    ``listing`` is the snapshot of ``parent`` taken when it turned out to
+    exist already (None for a folder this build just made). Anything found
+    in it is skipped without a syscall; only folders that already existed
+    are listed, once each, to get the snapshot for their own children.
+    """
+    known = listing.get(node.name) if listing else None
+    if node.is_folder:
+        if known:
+            handle = backend.open_dir(parent, node.name)
+            return handle, backend.listdir(handle), False
+        handle, created = backend.mkdir(parent, node.name)
+        return handle, (None if created else backend.listdir(handle)), created
+    if known is not None:
+        return None, None, False
+    return None, None, backend.create_file(parent, node.name, data)
+
+DURABILITY_MODES = ("none", "batched", "strict")
+
+class Durability:
+    """
+    When a build syncs what it created
+
+    ``none``: leave it to the OS. ``batched``: one syncfs for the whole
+    build, or where there is no syncfs one fsync per folder that got new
+    entries, after its children are all written (template bodies are then
+    left to the OS). Where folders can't be synced either (Windows) it
+    fsyncs every new file instead. ``strict``: fsync every
+    new file as it is written and every changed folder after its children.
+    """
+    __slots__ = ("mode", "backend", "sync_files", "sync_dirs", "dirty")
+    
+    def __init__(self, mode: str, backend):
+        if mode not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {mode}")
+        self.mode = mode
+        self.backend = backend
+        fallback = mode == "batched" and not backend.can_syncfs()
+        self.sync_files = mode == "strict" or (fallback and not backend.can_fsync_dirs())
+        self.sync_dirs = mode == "strict" or fallback
+        # Handles of folders that gained entries and still need their fsync
+        self.dirty = set()
+    
+    def created(self, parent, node, result):
+        """``node`` was just created inside ``parent``"""
+        if self.sync_dirs:
+            self.dirty.add(parent)
+        if self.sync_files and not node.is_folder:
+            start = time.perf_counter()
+            self.backend.fsync_file(parent, node.name)
+            result.add_time("files", time.perf_counter() - start)
+    
+    def folder_done(self, handle, result):
+        """Every child of folder ``handle`` has been written"""
+        if handle in self.dirty:
+            self.dirty.discard(handle)
+            start = time.perf_counter()
+            self.backend.fsync_dir(handle)
+            result.add_time("dirs", time.perf_counter() - start)
+    
+    def finish(self, root, result):
+        """The build succeeded; ``root`` is the handle of the base folder"""
+        self.folder_done(root, result)
+        if self.mode == "batched" and not self.sync_dirs and (result.folders or result.files):
+            start = time.perf_counter()
+            self.backend.syncfs(root)
+            result.add_time("syncfs", time.perf_counter() - start)
+
+def execute_plan(base_path: str, plan: BuildPlan, backend=None, workers: int = 1, durability: str = "none",
+                 journal=None, progress=None):
+    """
+    Execution phase: one mkdir per planned folder, then each file in place
+
+    Children are created relative to their parent's handle from the
+    backend (a directory fd where supported), never by full path.
+    With ``workers`` > 1 the plan is built level by level on a thread pool.
+    ``durability`` is one of DURABILITY_MODES; time spent syncing ends
+    up in ``result.timings``. With a ``journal`` the build records its
+    progress and starts after whatever the journal says is already done.
+    ``progress`` is called with a BuildProgress every PROGRESS_EVERY
+    entries, once more at the end, and with the error if the build fails.
+    """
+    backend = backend or default_backend()
+    sync = Durability(durability, backend)
+    if workers > 1:
+        return execute_plan_parallel(base_path, plan, backend, workers, sync, journal, progress)
+    result = BuildResult()
+    total = len(plan.order)
+    stack = []
+    
+    try:
+        root = backend.open_root(base_path)
+        start = journal.start("i") if journal is not None else 0
+        # stack[d] is (handle, listing) of the open folder at depth d
+        stack.append((root, backend.listdir(root)))
+        if start:
+            # A run can die after its last mark but before closing the journal
+            if start < total:
+                _reopen_ancestors(backend, plan.order[start], stack)
+            result.existing += start
         
-        # Remove extra descriptions in parentheses or quotes
-        line = re.sub(r'\s*["\(].*?["\)]\s*$', '', line)
+        for index in range(start, total):
+            node = plan.order[index]
+            while len(stack) > node.depth:
+                handle = stack.pop()[0]
+                sync.folder_done(handle, result)
+                backend.release(handle)
+            parent, listing = stack[-1]
+            handle, listing, created = place_node(backend, node, parent, listing, plan.data_for(node))
+            if node.is_folder:
+                stack.append((handle, listing))
+            if created:
+                sync.created(parent, node, result)
+            result.count(node.is_folder, created)
+            if journal is not None and (index + 1) % journal.every == 0:
+                journal.mark(index + 1)
+            if progress is not None and (index + 1) % PROGRESS_EVERY == 0:
+                _report(progress, total, result)
         
-        # Clean but keep if not empty
-        if line.strip():
-            cleaned_lines.append(line)
+        while len(stack) > 1:
+            handle = stack.pop()[0]
+            sync.folder_done(handle, result)
+            backend.release(handle)
+        sync.finish(root, result)
+        if journal is not None:
+            journal.close(completed=True)
+        _report(progress, total, result)
+    except Exception as error:
+        _report(progress, total, result, error)
+        raise
+    finally:
+        while stack:
+            backend.release(stack.pop()[0])
+        if journal is not None:
+            journal.close()
+        backend.close()
     
-    return '\n'.join(cleaned_lines)
+    return result
 
-def count_structure_items(structure_text: str):
-    """Count folders and files in structure"""
-    lines = structure_text.splitlines()
-    folders = 0
-    files = 0
+def _reopen_ancestors(backend, node, stack):
+    """Put the folders above ``node`` on the stack again when resuming"""
+    chain = []
+    parent = node.parent
+    while parent.parent is not None:
+        chain.append(parent)
+        parent = parent.parent
+    for folder in reversed(chain):
+        handle = backend.open_dir(stack[-1][0], folder.name)
+        # Listed, since entries after the last journal mark may exist already
+        stack.append((handle, backend.listdir(handle)))
+
+def _reopen_chunk(backend, nodes, handles, listed):
+    """Worker task when resuming: open the folders of a level that is already done"""
+    result = BuildResult()
+    for node in nodes:
+        if node.is_folder:
+            parent = handles[node.parent][0]
+            handle = backend.open_dir(parent, node.name)
+            handles[node] = (handle, backend.listdir(handle) if listed else None)
+        result.existing += 1
+    return result
+
+def _create_chunk(backend, plan, nodes, handles, sync):
+    """Worker task: create one slice of a level; returns a BuildResult"""
+    result = BuildResult()
+    for node in nodes:
+        parent, listing = handles[node.parent]
+        handle, listing, created = place_node(backend, node, parent, listing, plan.data_for(node))
+        if node.is_folder:
+            handles[node] = (handle, listing)
+        if created:
+            sync.created(parent, node, result)
+        result.count(node.is_folder, created)
+    return result
+
+def execute_plan_parallel(base_path: str, plan: BuildPlan, backend, workers: int, sync=None, journal=None,
+                          progress=None):
+    """
+    Level-synchronous execution on a thread pool
+
+    Every level is cut into chunks that run concurrently, and the next
+    level only starts once all of them are done, so a parent always exists
+    before any of its children. Folder handles of a level are released as
+    soon as the level below it is finished, so two levels' worth are open
+    at a time; past MAX_OPEN_HANDLES the backend's path handles are used
+    instead. ``progress`` hears about every finished chunk, always on the
+    calling thread.
+    """
+    levels = plan.levels()
+    widths = [sum(1 for node in level if node.is_folder) for level in levels]
+    if max(map(sum, zip(widths, widths[1:] + [0])), default=0) > MAX_OPEN_HANDLES:
+        backend = backend.path_handles()
+    sync = sync or Durability("none", backend)
+    sync.backend = backend
+    result = BuildResult()
+    total = len(plan.order)
+    root = plan.trie.root
+    # node -> (handle, listing), filled in by the workers as folders are made
+    handles = {}
     
-    for line in lines:
-        # Clean tree characters
-        clean_line = (
-            line.replace("├──", "")
-            .replace("└──", "")
-            .replace("│", "")
-            .replace("─", "")
-            .strip()
-        )
+    try:
+        root_handle = backend.open_root(base_path)
+        handles[root] = (root_handle, backend.listdir(root_handle))
+        start = journal.start("l") if journal is not None else 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            previous = [root]
+            for number, level in enumerate(levels):
+                size = max(MIN_CHUNK, -(-len(level) // (workers * 4)))
+                if number < start:
+                    # Done by an earlier run: only reopen its folders, listing
+                    # the ones whose children may be half made
+                    listed = number == start - 1
+                    futures = [
+                        pool.submit(_reopen_chunk, backend, level[i:i + size], handles, listed)
+                        for i in range(0, len(level), size)
+                    ]
+                else:
+                    futures = [
+                        pool.submit(_create_chunk, backend, plan, level[i:i + size], handles, sync)
+                        for i in range(0, len(level), size)
+                    ]
+                try:
+                    for future in as_completed(futures):
+                        result.merge(future.result())
+                        _report(progress, total, result)
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    wait(futures)
+                    raise
+                # Barrier: every chunk of this level is done
+                if journal is not None and number >= start:
+                    journal.mark(number + 1)
+                
+                for node in previous:
+                    if node is not root:
+                        handle = handles.pop(node)[0]
+                        sync.folder_done(handle, result)
+                        backend.release(handle)
+                previous = [node for node in level if node in handles]
         
-        if clean_line:
-            if clean_line.endswith('/'):
-                folders += 1
-            else:
-                files += 1
+        for node in previous:
+            handle = handles.pop(node)[0]
+            sync.folder_done(handle, result)
+            backend.release(handle)
+        sync.finish(root_handle, result)
+        if journal is not None:
+            journal.close(completed=True)
+        _report(progress, total, result)
+    except Exception as error:
+        _report(progress, total, result, error)
+        raise
+    finally:
+        for handle, _ in handles.values():
+            backend.release(handle)
+        if journal is not None:
+            journal.close()
+        backend.close()
     
-    return folders, files
+    return result
+
+def _subtree_sizes(plan: BuildPlan):
+    """Number of nodes under (and including) every planned node"""
+    sizes = {}
+    for node in reversed(plan.order):
+        sizes[node] = sizes.get(node, 0) + 1
+        if node.parent is not plan.trie.root:
+            sizes[node.parent] = sizes.get(node.parent, 0) + sizes[node]
+    return sizes
+
+def shard_plan(plan: BuildPlan, shards: int):
+    """
+    Split the plan into ``shards`` independent groups of subtrees
+
+    Starts from the top-level entries and keeps opening up the biggest
+    folder until there are enough subtrees to spread evenly. Returns
+    (expanded, groups): ``expanded`` are the opened folders, parents first,
+    which the caller creates before handing the groups out.
+    """
+    sizes = _subtree_sizes(plan)
+    roots = list(plan.trie.root.children.values()) if plan.trie.root.children else []
+    expanded = []
+    # Aim for a few subtrees per shard so the bins balance out
+    while roots and len(roots) < shards * 4:
+        biggest = max(roots, key=sizes.__getitem__)
+        if not biggest.children:
+            break
+        roots.remove(biggest)
+        expanded.append(biggest)
+        roots.extend(biggest.children.values())
+    
+    # Greedy bin packing: largest subtree into the lightest shard
+    groups = [[] for _ in range(min(shards, len(roots)))]
+    loads = [0] * len(groups)
+    for node in sorted(roots, key=sizes.__getitem__, reverse=True):
+        lightest = loads.index(min(loads))
+        groups[lightest].append(node)
+        loads[lightest] += sizes[node]
+    return expanded, groups
+
+def encode_shard(subtrees) -> bytes:
+    """
+    Serialise subtrees as ``depth<TAB>kind<TAB>name`` lines
+
+    Each subtree starts with an ``R`` line holding the relative path of the
+    folder it goes in (depth 0); ``D``/``F`` lines below it carry the depth
+    relative to that folder. Much smaller to send to a worker than pickled
+    node objects or full path strings.
+    """
+    lines = []
+    for top in subtrees:
+        lines.append(f"0\tR\t{top.parent.path()}")
+        base_depth = top.depth - 1
+        stack = [top]
+        while stack:
+            node = stack.pop()
+            lines.append(f"{node.depth - base_depth}\t{'D' if node.is_folder else 'F'}\t{node.name}")
+            if node.children:
+                stack.extend(reversed(list(node.children.values())))
+    return "\n".join(lines).encode("utf-8")
+
+def build_shard(base_path: str, blob: bytes, contents=None):
+    """Process pool worker: create one encoded shard; returns (folders, files, existing)"""
+    backend = default_backend()
+    result = BuildResult()
+    stack = []
+    
+    try:
+        for line in blob.decode("utf-8").split("\n"):
+            depth, kind, name = line.split("\t", 2)
+            depth = int(depth)
+            while len(stack) > depth:
+                backend.release(stack.pop()[0])
+            if kind == "R":
+                handle = backend.open_root(os.path.join(base_path, name))
+                stack.append((handle, backend.listdir(handle), name.replace(os.sep, "/")))
+                continue
+            # The shard only carries names, and place_node only needs those
+            node = PathNode(name, None, kind == "D")
+            parent, listing, parent_path = stack[-1]
+            path = f"{parent_path}/{name}" if parent_path else name
+            data = contents.render(name, path) if contents is not None and kind == "F" else b''
+            handle, listing, created = place_node(backend, node, parent, listing, data)
+            if node.is_folder:
+                stack.append((handle, listing, path))
+            result.count(node.is_folder, created)
+    finally:
+        while stack:
+            backend.release(stack.pop()[0])
+        backend.close()
+    
+    return result.folders, result.files, result.existing
+
+def execute_plan_sharded(base_path: str, plan: BuildPlan, processes: int = None, progress=None):
+    """
+    Build independent subtrees of the plan in separate processes
+
+    For very large trees, where the per-entry Python work itself is the
+    limit. Shards are created with no coordination between workers, and
+    their counts are merged into one BuildResult; ``progress`` hears
+    about each shard as it finishes.
+    """
+    processes = processes or os.cpu_count() or 1
+    result = BuildResult()
+    total = len(plan.order)
+    expanded, groups = shard_plan(plan, processes)
+    
+    # The few opened-up folders are made here so every shard's anchor exists
+    backend = PathBackend()
+    backend.open_root(base_path)
+    for node in expanded:
+        _, created = backend.mkdir(os.path.join(base_path, node.parent.path()), node.name)
+        if created:
+            result.folders += 1
+        else:
+            result.existing += 1
+    
+    if not groups:
+        _report(progress, total, result)
+        return result
+    try:
+        with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+            futures = [pool.submit(build_shard, base_path, encode_shard(group), plan.contents) for group in groups]
+            for future in as_completed(futures):
+                folders, files, existing = future.result()
+                result.folders += folders
+                result.files += files
+                result.existing += existing
+                _report(progress, total, result)
+    except Exception as error:
+        _report(progress, total, result, error)
+        raise
+    
+    return result
+
+async def execute_plan_async(base_path: str, plan: BuildPlan, concurrency: int = BUILD_WORKERS, executor=None,
+                             progress=None):
+    """
+    Execute a plan from an event loop with at most ``concurrency`` operations in flight
 
-def build_structure(base_path: str, structure_text: str):
+    Each mkdir/create runs on ``executor`` (a private thread pool if None).
+    A folder's children are queued as soon as its own mkdir finishes, so
+    slow filesystems get many independent operations overlapped instead
+    of waiting on a level barrier. Handles are plain paths here: nothing is
+    held open, so cancelling the build mid-way leaks no descriptors.
+    ``progress`` is called on the event loop, every PROGRESS_EVERY entries.
+    """
+    loop = asyncio.get_running_loop()
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+    backend = PathBackend()
+    result = BuildResult()
+    total = len(plan.order)
+    # Only ``concurrency`` workers pull from the queue, which is the back-pressure
+    queue = asyncio.Queue()
+    errors = []
+    
+    async def worker():
+        while True:
+            node, parent, listing = await queue.get()
+            try:
+                if errors:
+                    continue
+                path, children_listing, created = await loop.run_in_executor(
+                    executor, place_node, backend, node, parent, listing, plan.data_for(node))
+                result.count(node.is_folder, created)
+                if progress is not None and result.total % PROGRESS_EVERY == 0:
+                    _report(progress, total, result)
+                if node.children:
+                    for child in node.children.values():
+                        queue.put_nowait((child, path, children_listing))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                queue.task_done()
+    
+    try:
+        root = await loop.run_in_executor(executor, backend.open_root, base_path)
+        listing = await loop.run_in_executor(executor, backend.listdir, root)
+        for child in (plan.trie.root.children or {}).values():
+            queue.put_nowait((child, root, listing))
+        workers = [loop.create_task(worker()) for _ in range(max(1, concurrency))]
+        try:
+            await queue.join()
+            # Every operation has finished; after a cancel some may still be
+            # running on the executor, so the backend is left to the GC then
+            backend.close()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    except Exception as error:
+        _report(progress, total, result, error)
+        raise
+    finally:
+        if own_executor:
+            executor.shutdown(wait=False)
+    
+    if errors:
+        _report(progress, total, result, errors[0])
+        raise errors[0]
+    _report(progress, total, result)
+    return result
+
+async def build_structure_async(base_path: str, structure_text, concurrency: int = BUILD_WORKERS, executor=None,
+                                progress=None):
+    """
+    Awaitable build_structure for event-loop based services; returns a BuildResult
+
+    Parsing also happens on the executor so the loop is never blocked.
+    """
+    loop = asyncio.get_running_loop()
+    plan = await loop.run_in_executor(executor, plan_build, structure_text)
+    return await execute_plan_async(base_path, plan, concurrency, executor, progress)
+
+def build_structure(base_path: str, structure_text, workers: int = 1, processes: int = 0, templates=None,
+                    backend=None, durability: str = "none", journal: bool = False, limiter=None,
+                    low_priority: bool = False, progress=None):
     """
     Build folder/file structure with proper nesting
+
+    ``structure_text`` may also be a StructureTree that was already parsed
+    for the preview, in which case no text is parsed again. ``workers`` > 1
+    creates each level of the tree in parallel; ``processes`` > 1 spreads
+    top-level subtrees over a process pool instead. New files get their
+    body from ``templates`` (extension -> text) when given. ``backend``
+    (e.g. a MemoryBackend) replaces the real filesystem. ``durability``
+    (none/batched/strict) decides what gets fsynced; process shards
+    don't sync, so it needs the serial or threaded engine. With
+    ``journal`` the build can be picked up by resume_build if it dies,
+    and itself continues a matching unfinished build in the target.
+    A RateLimiter in ``limiter`` caps ops/bytes per second (and can be
+    changed while the build runs); ``low_priority`` puts the building
+    threads in the idle I/O class at the lowest CPU priority. Those are
+    never the caller's thread: a low-priority build runs on a thread of
+    its own, which is also where ``progress`` is called from then.
+
+    ``progress`` is called with BuildProgress events while the build runs
+    (see build_events for the same as an iterator). Returns a BuildResult.
     """
-    # Clean the structure text first
-    structure_text = clean_structure_text(structure_text)
-    lines = structure_text.splitlines()
+    plan = plan_build(structure_text, templates)
+    throttled = limiter is not None or low_priority
+    if processes > 1 and backend is None:
+        if durability != "none" or journal or throttled:
+            raise ValueError("durability, journal and throttling need the threaded builder, not processes")
+        return execute_plan_sharded(base_path, plan, processes, progress)
+    log = open_journal(base_path, plan) if journal else None
+    if throttled:
+        backend = ThrottledBackend(backend or default_backend(), limiter, low_priority)
+    if low_priority:
+        return run_in_thread(execute_plan, base_path, plan, backend, workers=workers, durability=durability,
+                             journal=log, progress=progress)
+    return execute_plan(base_path, plan, backend, workers=workers, durability=durability, journal=log,
+                        progress=progress)
+
+def build_events(base_path: str, structure_text, **options):
+    """
+    Run build_structure on a background thread and yield its BuildProgress
+    events as they happen
+
+    Takes the same options as build_structure. The last event carries the
+    final counts; if the build failed its ``error`` is set and the error is
+    raised once that event has been yielded.
+    """
+    events = queue.Queue()
+    failure = []
     
-    if not lines:
-        return []
+    def run():
+        try:
+            build_structure(base_path, structure_text, progress=events.put, **options)
+        except BaseException as error:
+            failure.append(error)
+        finally:
+            # End marker
+            events.put(None)
     
-    created_items = []
-    path_stack = []
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        yield event
+    thread.join()
+    if failure:
+        raise failure[0]
+
+
+def open_journal(base_path: str, plan: BuildPlan, every: int = JOURNAL_EVERY):
+    """Journal for building ``plan`` into ``base_path``, loaded with any earlier progress"""
+    journal = Journal(base_path, spec_digest(plan.order, relative_paths(plan.order)), every)
+    journal.load()
+    return journal
+
+def resume_build(base_path: str, structure_text, workers: int = 1, templates=None, durability: str = "none",
+                 every: int = JOURNAL_EVERY, backend=None, progress=None):
+    """
+    Finish a journaled build that was interrupted
+
+    Entries the journal marks as done are skipped without touching the
+    disk; the engine that wrote the journal is used again, so its marks
+    mean the same thing. Without a matching journal this is a normal
+    journaled build. Returns a BuildResult.
+    """
+    plan = plan_build(structure_text, templates)
+    journal = open_journal(base_path, plan, every)
+    if journal.kind == "i":
+        workers = 1
+    elif journal.kind == "l":
+        workers = max(workers, 2)
+    return execute_plan(base_path, plan, backend, workers=workers, durability=durability, journal=journal,
+                        progress=progress)
+
+def sync_structure(base_path: str, structure_text, remove: bool = False, templates=None):
+    """
+    Idempotent build: only create what changed since the last sync
+
+    The manifest left in the target by the previous run is diffed against
+    the spec; an unchanged spec costs one small file read. With ``remove``
+    entries that left the spec are deleted too, as long as they were not
+    modified since. Returns a BuildResult.
+    """
+    plan = plan_build(structure_text, templates)
+    paths = relative_paths(plan.order)
+    digest = spec_digest(plan.order, paths)
+    previous = Manifest.load(base_path)
     
-    for line in lines:
-        # Count indentation level
-        original_line = line
-        depth = 0
-        
-        # Count tree characters to determine depth
-        for char in line:
-            if char in '│├└─ ':
-                if char == '│':
-                    depth += 1
-                elif char in '├└':
-                    depth += 1
-                    break
-            else:
-                break
-        
-        # Clean the line
-        clean_line = (
-            line.replace("├──", "")
-            .replace("└──", "")
-            .replace("│", "")
-            .replace("─", "")
-            .strip()
-        )
-        
-        if not clean_line:
-            continue
-        
-        # Adjust path stack based on depth
-        while len(path_stack) > depth:
-            path_stack.pop()
+    if previous is not None and previous.digest == digest:
+        result = BuildResult()
+        result.existing = len(plan.order)
+        return result
+    
+    if previous is None:
+        result = execute_plan(base_path, plan)
+    else:
+        result = BuildResult()
+        backend = PathBackend()
+        backend.open_root(base_path)
+        try:
+            for node, path in zip(plan.order, paths):
+                entry = previous.entries.get(path)
+                if entry is not None and entry[0] == node.is_folder:
+                    result.existing += 1
+                    continue
+                # Parents come first in plan order, so this one exists by now
+                parent = os.path.join(base_path, os.path.dirname(path))
+                _, _, created = place_node(backend, node, parent, None, plan.data_for(node))
+                result.count(node.is_folder, created)
+        finally:
+            backend.close()
+        if remove:
+            result.removed = previous.remove_stale(base_path, paths)
+    
+    manifest = Manifest(digest)
+    for node, path in zip(plan.order, paths):
+        manifest.record(base_path, path, node.is_folder, previous)
+    manifest.save(base_path)
+    return result
+
+
+def _sibling_path(path: str, tag: str) -> str:
+    """Unused hidden name next to ``path``, so renames stay on one filesystem"""
+    head, name = os.path.split(path)
+    return os.path.join(head, f".{name}.{tag}-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+
+def build_staged(base_path: str, structure_text, workers: int = 1, templates=None, durability: str = "none"):
+    """
+    Transactional build: the target shows either the old tree or the
+    complete new one, never anything in between
+
+    The tree is built in a hidden sibling folder and then swapped in with
+    one atomic rename (renameat2 RENAME_EXCHANGE where the kernel has it).
+    Whatever was in ``base_path`` before is replaced, not merged. On any
+    error the staging folder is removed and the target is left untouched.
+    With ``durability`` other than "none" the staged tree is synced before
+    it is published, and the rename itself afterwards.
+    """
+    target = os.path.abspath(base_path)
+    plan = plan_build(structure_text, templates)
+    staging = _sibling_path(target, "staging")
+    os.mkdir(staging)
+    
+    try:
+        if os.path.isdir(target):
+            os.chmod(staging, os.stat(target).st_mode & 0o7777)
+        result = execute_plan(staging, plan, workers=workers, durability=durability)
         
-        # Build current path
-        if depth == 0:
-            # Root level
-            current_path = os.path.join(base_path, clean_line.rstrip('/'))
+        old_tree = None
+        if not os.path.isdir(target):
+            os.rename(staging, target)
+        elif exchange_paths(staging, target):
+            # The old tree now sits under the staging name
+            old_tree = staging
         else:
-            # Nested level
-            if path_stack:
-                parent_path = os.path.join(base_path, *path_stack)
-                current_path = os.path.join(parent_path, clean_line.rstrip('/'))
-            else:
-                current_path = os.path.join(base_path, clean_line.rstrip('/'))
+            # No atomic exchange: move the old tree aside, then put the new one in
+            old_tree = _sibling_path(target, "old")
+            os.rename(target, old_tree)
+            try:
+                os.rename(staging, target)
+            except OSError:
+                os.rename(old_tree, target)
+                raise
         
-        # Create folder or file
-        if clean_line.endswith('/'):
-            # It's a folder
-            folder_name = clean_line.rstrip('/')
-            os.makedirs(current_path, exist_ok=True)
-            created_items.append(f"📁 {folder_name}")
-            
-            # Add to path stack for nested items
-            if depth == 0:
-                path_stack = [folder_name]
+        if durability != "none" and sys.platform != "win32":
+            start = time.perf_counter()
+            fsync_path(os.path.dirname(target))
+            result.add_time("publish", time.perf_counter() - start)
+        if old_tree:
+            shutil.rmtree(old_tree, ignore_errors=True)
+        return result
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def build_archive(output, structure_text, root_name: str = "", fmt: str = None, templates=None):
+    """
+    Write the structure as a tar/zip archive instead of real files
+
+    ``output`` is a path, "-" for stdout, or a binary file object; the
+    format comes from its suffix unless ``fmt`` is given (tar, tar.gz,
+    tar.bz2, tar.xz, tar.zst, zip). Entries are streamed straight from the
+    plan with no temporary files. Returns a BuildResult.
+    """
+    plan = plan_build(structure_text, templates)
+    return execute_plan(root_name, plan, ArchiveBackend(output, fmt))
+
+def preview_structure(structure_text, limit: int = 25):
+    """
+    Describe what a build into an empty folder would really produce
+
+    Unlike the spec lines themselves this shows duplicates merged, entries
+    with children turned into folders and "a/b/c" names split up. Returns
+    (BuildResult, lines) with at most ``limit`` indented lines. Cheap enough
+    for every keystroke: the counts come straight from the trie and only
+    the first ``limit`` nodes are walked.
+    """
+    trie = load_tree(structure_text).trie()
+    result = BuildResult()
+    # Nothing exists yet in an empty target, so every trie node is created
+    result.folders, result.files = trie.folders, trie.files
+    lines = []
+    for node in islice(trie.walk(), limit):
+        indent = "    " * (node.depth - 1)
+        lines.append(f"{indent}📁 {node.name}/" if node.is_folder else f"{indent}📄 {node.name}")
+    return result, lines
+
+class DryRunReport:
+    """What a build would do to a target, counted without touching it"""
+    __slots__ = ("mkdirs", "creates", "writes", "template_bytes", "max_depth", "max_fanout", "existing")
+    
+    def __init__(self):
+        self.mkdirs = 0           # folders that would be created
+        self.creates = 0          # files that would be created
+        self.writes = 0           # of those, files that get a template body
+        self.template_bytes = 0   # bytes of template bodies written
+        self.max_depth = 0
+        self.max_fanout = 0       # most entries directly inside one folder
+        self.existing = 0         # planned entries already in the target
+    
+    @property
+    def inodes(self):
+        """New inodes the build would use up"""
+        return self.mkdirs + self.creates
+    
+    @property
+    def syscalls(self):
+        return self.mkdirs + self.creates + self.writes
+    
+    def __str__(self):
+        return "\n".join([
+            f"📁 mkdir:    {self.mkdirs}",
+            f"📄 create:   {self.creates}",
+            f"✍️ write:    {self.writes} ({self.template_bytes} template bytes)",
+            f"📏 depth:    {self.max_depth}, widest folder: {self.max_fanout} entries",
+            f"♻️ existing: {self.existing}",
+        ])
+
+def dry_run(base_path: str, structure, templates=None):
+    """
+    Parse and plan only, then count what executing the plan would cost
+
+    Folders that already exist in ``base_path`` are listed (one scandir
+    each, as a real build would) to find entries that would be skipped.
+    ``structure`` may be text, a StructureTree or a BuildPlan.
+    """
+    plan = structure if isinstance(structure, BuildPlan) else plan_build(structure, templates)
+    backend = PathBackend()
+    report = DryRunReport()
+    report.max_depth = plan.max_depth
+    root = plan.trie.root
+    report.max_fanout = len(root.children or ())
+    # Existing folder node -> (path, listing); anything not in here is new
+    existing = {}
+    if os.path.isdir(base_path):
+        existing[root] = (base_path, backend.listdir(base_path))
+    
+    for node in plan.order:
+        parent = existing.get(node.parent)
+        known = parent[1].get(node.name) if parent else None
+        if node.is_folder:
+            report.max_fanout = max(report.max_fanout, len(node.children or ()))
+            if known:
+                path = os.path.join(parent[0], node.name)
+                existing[node] = (path, backend.listdir(path))
+                report.existing += 1
             else:
-                path_stack = path_stack[:depth] + [folder_name]
+                report.mkdirs += 1
+        elif known is not None:
+            report.existing += 1
+        else:
+            report.creates += 1
+            data = plan.data_for(node)
+            if data:
+                report.writes += 1
+                report.template_bytes += len(data)
+    
+    return report
+
+
+def build_from_entries(base_path: str, entries):
+    """
+    Create (relative_path, is_folder) entries as they arrive from a generator
+
+    Nothing is collected, so memory stays flat no matter how long the
+    stream is. Returns (folders, files) counts.
+    """
+    folders = 0
+    files = 0
+    # Parent directories already ensured, so each one is made once
+    ready_dirs = set()
+    
+    for rel_path, is_folder in entries:
+        current_path = os.path.join(base_path, rel_path)
+        
+        if is_folder:
+            if current_path not in ready_dirs:
+                os.makedirs(current_path, exist_ok=True)
+                ready_dirs.add(current_path)
+            folders += 1
         else:
-            # It's a file
-            os.makedirs(os.path.dirname(current_path), exist_ok=True)
-            if not os.path.exists(current_path):
-                with open(current_path, 'w', encoding='utf-8') as f:
-                    f.write('')  # Create empty file
-            created_items.append(f"📄 {clean_line}")
+            parent_path = os.path.dirname(current_path)
+            if parent_path not in ready_dirs:
+                os.makedirs(parent_path, exist_ok=True)
+                ready_dirs.add(parent_path)
+            create_placeholder(current_path)
+            files += 1
+    
+    return folders, files
+
+def build_structure_stream(base_path: str, spec_file):
+    """Build straight from an open spec file, one line at a time"""
+    return build_from_entries(base_path, iter_structure(spec_file))
+
+def build_from_file(base_path: str, spec_path: str):
+    """Build from a spec file on disk, parsing directly over a memory map"""
+    return build_from_entries(base_path, iter_structure_file(spec_path))
+
+
+def main(argv=None):
+    """Command line entry point: build a spec file into a target folder"""
+    parser = argparse.ArgumentParser(description="Build a folder/file structure from a spec file")
+    parser.add_argument("spec", help="structure spec file (tree, indented or AI output)")
+    parser.add_argument("target", help="folder to build the structure in")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+                        help="create each level of the tree on this many threads")
+    parser.add_argument("-p", "--processes", type=int, default=1,
+                        help="split the tree into subtrees built by this many processes")
+    parser.add_argument("--sync", action="store_true",
+                        help="only create what changed since the last --sync (keeps a manifest in the target)")
+    parser.add_argument("--remove", action="store_true",
+                        help="with --sync, also delete unmodified entries that left the spec")
+    parser.add_argument("--staged", action="store_true",
+                        help="build next to the target and swap it in atomically (replaces the target)")
+    parser.add_argument("-n", "--dry-run", action="store_true",
+                        help="only report what the build would do")
+    parser.add_argument("--max-inodes", type=int, default=None,
+                        help="refuse the build if it would create more entries than this")
+    parser.add_argument("-t", "--templates", action="store_true",
+                        help="fill new files with the starter content for their extension")
+    parser.add_argument("--durability", choices=DURABILITY_MODES, default="none",
+                        help="fsync policy: none, batched (syncfs / per folder) or strict (every file)")
+    parser.add_argument("--journal", action="store_true",
+                        help="record progress in the target so an interrupted build can --resume")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted --journal build where it stopped")
+    parser.add_argument("--max-ops", type=float, default=0,
+                        help="cap filesystem operations per second")
+    parser.add_argument("--max-bytes", type=float, default=0,
+                        help="cap template bytes written per second")
+    parser.add_argument("--low-priority", action="store_true",
+                        help="build in the idle I/O class at the lowest CPU priority")
+    parser.add_argument("--hardlink", action="store_true",
+                        help="hard link files with identical template bodies instead of copying them")
+    parser.add_argument("--archive", metavar="FILE",
+                        help="write a tar/zip archive (\"-\" for stdout) with target as its top folder")
+    parser.add_argument("--archive-format", choices=sorted(ARCHIVE_FORMATS),
+                        help="archive format when it can't be told from the file name")
+    args = parser.parse_args(argv)
+    
+    templates = None
+    if args.templates:
+        templates = TemplateSet(FILE_TEMPLATES, os.path.basename(os.path.abspath(args.target)))
+    
+    if args.archive:
+        with open(args.spec, encoding="utf-8-sig") as spec_file:
+            result = build_archive(args.archive, spec_file.read(), args.target, args.archive_format, templates)
+        # stdout may be the archive itself
+        print(f"✅ Archived {result.folders} folders, {result.files} files to {args.archive}",
+              file=sys.stderr if args.archive == "-" else sys.stdout)
+        return 0
+    
+    planned = (args.dry_run or args.max_inodes is not None or args.staged or args.sync
+               or args.workers > 1 or args.processes > 1 or args.hardlink or templates
+               or args.durability != "none" or args.journal or args.resume
+               or args.max_ops or args.max_bytes or args.low_priority)
+    if not planned:
+        folders, files = build_from_file(args.target, args.spec)
+        print(f"✅ Created {folders} folders, {files} files in {args.target}")
+        return 0
+    
+    # utf-8-sig drops the BOM Notepad writes, as the mmap reader does
+    with open(args.spec, encoding="utf-8-sig") as spec_file:
+        spec = spec_file.read()
+    
+    if args.dry_run or args.max_inodes is not None:
+        report = dry_run(args.target, spec, templates)
+        if args.dry_run:
+            print(report)
+            return 0
+        if report.inodes > args.max_inodes:
+            print(f"❌ Build would create {report.inodes} entries, over the limit of {args.max_inodes}",
+                  file=sys.stderr)
+            return 1
+    
+    if args.staged:
+        result = build_staged(args.target, spec, workers=args.workers, templates=templates,
+                              durability=args.durability)
+        print(f"✅ Published {result.folders} folders, {result.files} files to {args.target}")
+        return 0
+    
+    if args.sync:
+        result = sync_structure(args.target, spec, remove=args.remove, templates=templates)
+        print(f"✅ Created {result.folders} folders, {result.files} files, "
+              f"removed {result.removed}, {result.existing} unchanged in {args.target}")
+        return 0
+    
+    backend = default_backend(args.hardlink)
+    throttled = bool(args.max_ops or args.max_bytes or args.low_priority)
+    if throttled:
+        backend = ThrottledBackend(backend, RateLimiter(args.max_ops, args.max_bytes), args.low_priority)
+    
+    if args.resume:
+        result = resume_build(args.target, spec, workers=max(args.workers, args.processes), templates=templates,
+                              durability=args.durability, backend=backend)
+        print(f"✅ Resumed: created {result.folders} folders, {result.files} files in {args.target}")
+        return 0
     
-    return created_items
+    plan = plan_build(spec, templates)
+    journal = open_journal(args.target, plan) if args.journal else None
+    if args.processes > 1 and args.durability == "none" and journal is None and not throttled:
+        result = execute_plan_sharded(args.target, plan, args.processes)
+    else:
+        # Process shards can't sync, journal or throttle, so threads stand in for them then
+        result = execute_plan(args.target, plan, backend,
+                              workers=max(args.workers, args.processes), durability=args.durability,
+                              journal=journal)
+    print(f"✅ Created {result.folders} folders, {result.files} files in {args.target}")
+    for stage, seconds in result.timings.items():
+        print(f"⏱️ sync {stage}: {seconds:.3f}s")
+    return 0
 
 
 if __name__ == "__main__":
-    # Example structure (tu apna structure paste kar sakta hai)
-    test_structure = """MySoftware/
-├── src/
-│   ├── main.py
-│   └── utils.py
-├── config/
-│   └── config.py
-├── tests/
-│   └── test_main.py
-├── requirements.txt
-├── setup.py
-├── .gitignore
-└── README.md
-"""
-    items = build_structure("D:/file testerer", test_structure)
-    print(f"✅ Created {len(items)} items")
-    for item in items:
-        print(item)
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import os
+from builder import build_from_entries
 
 # 🔹 Root project folder (isske andar structure banega)
 ROOT = os.path.join(os.getcwd(), "MySoftware")
@@ -19,23 +20,19 @@ structure = {
 # 🔹 Root-level files
 root_files = ["LICENSE", "requirements.txt", "setup.py", "README.md"]
 
+def iter_entries(structure, root_files):
+    """Yield (relative_path, is_folder) entries for the folder → files mapping"""
+    for folder, files in structure.items():
+        yield folder, True
+        for file in files:
+            yield os.path.join(folder, file), False
+    for file in root_files:
+        yield file, False
+
 # ✅ Create root folder
 os.makedirs(ROOT, exist_ok=True)
 
-# ✅ Create folders + files
-for folder, files in structure.items():
-    folder_path = os.path.join(ROOT, folder)
-    os.makedirs(folder_path, exist_ok=True)
-
-    for file in files:
-        file_path = os.path.join(folder_path, file)
-        if not os.path.exists(file_path):
-            open(file_path, "w", encoding="utf-8").close()  # empty file
-
-# ✅ Create root-level files
-for file in root_files:
-    file_path = os.path.join(ROOT, file)
-    if not os.path.exists(file_path):
-        open(file_path, "w", encoding="utf-8").close()  # empty file
+# ✅ Create folders + files through the same engine as the GUI builder
+build_from_entries(ROOT, iter_entries(structure, root_files))
 
 print(f"✅ File structure created at: {ROOT}")
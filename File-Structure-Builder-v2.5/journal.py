@@ -0,0 +1,75 @@
+import os
+
+# Lives in the root of the target folder while a build is running
+JOURNAL_NAME = ".structure-journal"
+JOURNAL_HEADER = "structure-journal 1"
+# Entries between two progress marks
+JOURNAL_EVERY = 1000
+
+O_BINARY = getattr(os, "O_BINARY", 0)
+
+
+class Journal:
+    """
+    Write-ahead progress log of one build, so a killed build can resume
+
+    The first line names the spec digest; every later line is a mark like
+    ``i5000`` (the first 5000 entries of the plan order are done) or ``l3``
+    (the first 3 levels are done, for the threaded engine). Marks are
+    appended with a single os.write, so they survive the process dying.
+    The file is removed once the build completes.
+    """
+    __slots__ = ("path", "digest", "every", "kind", "done", "_fd")
+
+    def __init__(self, base_path: str, digest: str, every: int = JOURNAL_EVERY):
+        self.path = os.path.join(base_path, JOURNAL_NAME)
+        self.digest = digest
+        self.every = max(1, every)
+        self.kind = None      # "i" or "l" once marks exist
+        self.done = 0         # progress of the last mark
+        self._fd = None
+
+    def load(self) -> bool:
+        """Pick up the progress of an earlier run of the same spec"""
+        try:
+            with open(self.path, "rb") as handle:
+                data = handle.read().decode("utf-8", "replace")
+        except OSError:
+            return False
+        # A torn last line (no newline) never counts
+        lines = data.split("\n")[:-1]
+        if not lines or lines[0] != f"{JOURNAL_HEADER} {self.digest}":
+            return False
+        for line in lines[1:]:
+            if line[:1] in ("i", "l") and line[1:].isdigit():
+                self.kind, self.done = line[0], int(line[1:])
+        return True
+
+    def start(self, kind: str) -> int:
+        """Open for writing ``kind`` marks; returns the progress to resume from"""
+        if self.kind != kind:
+            self.done = 0
+        flags = os.O_WRONLY | os.O_CREAT | O_BINARY
+        if self.done:
+            self._fd = os.open(self.path, flags | os.O_APPEND)
+        else:
+            self._fd = os.open(self.path, flags | os.O_TRUNC)
+            os.write(self._fd, f"{JOURNAL_HEADER} {self.digest}\n".encode("utf-8"))
+        self.kind = kind
+        return self.done
+
+    def mark(self, done: int):
+        """Everything up to ``done`` is on disk"""
+        os.write(self._fd, f"{self.kind}{done}\n".encode("ascii"))
+        self.done = done
+
+    def close(self, completed: bool = False):
+        """Stop writing; a completed build has no use for the journal"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if completed:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
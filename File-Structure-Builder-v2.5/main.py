@@ -6,7 +6,8 @@ try:
     import winsound
 except ImportError:
     winsound = None
-from builder import build_structure, count_structure_items, clean_structure_text
+from builder import BUILD_WORKERS, build_structure
+from structure_parser import IncrementalParser
 from ai_assistant import ProjectStructureAI
 
 # Clean theme
@@ -48,6 +49,7 @@ class FileStructureBuilderApp:
         
         self.output_dir = None
         self.ai_assistant = ProjectStructureAI()
+        self.parser = IncrementalParser()
         
         # Center window on screen
         self.center_window()
@@ -184,6 +186,10 @@ class FileStructureBuilderApp:
         self.text_area.bind('<KeyRelease>', self.on_text_change)
         self.text_area.bind('<Button-1>', lambda e: self.root.after(50, self.on_text_change))
         self.text_area.bind('<Control-v>', lambda e: self.root.after(100, self.on_text_change))
+        # Edits that don't end at the cursor (middle-click paste, menu cut/paste)
+        # get a full re-parse instead of the keystroke path
+        for sequence in ('<ButtonRelease-2>', '<<Paste>>', '<<Cut>>'):
+            self.text_area.bind(sequence, lambda e: self.root.after(50, self.on_text_change), add='+')
         
         # Initial call to setup preview
         self.root.after(100, self.on_text_change)
@@ -289,18 +295,25 @@ class FileStructureBuilderApp:
     def on_text_change(self, event=None):
         """FIXED Live Preview Function"""
         try:
-            # Get current text
-            structure_text = self.text_area.get("1.0", tk.END).strip()
+            if event is not None and not event.state & 0x4:
+                # Plain keystroke - nothing to do unless the text really changed
+                if not self.text_area.edit_modified():
+                    return
+                self.update_changed_lines()
+            elif self.text_area.edit_modified():
+                # Paste or AI output - parse the whole text again; clicks and
+                # repeated paste callbacks find the flag cleared and skip this
+                self.parser.reset(self.text_area.get("1.0", "end-1c"))
+            self.text_area.edit_modified(False)
             
             # Enable preview area for editing
             self.preview_area.config(state="normal")
             self.preview_area.delete("1.0", tk.END)
             
-            if structure_text:
+            if len(self.parser):
                 try:
-                    # Use builder functions to process
-                    cleaned_text = clean_structure_text(structure_text)
-                    folders, files = count_structure_items(cleaned_text)
+                    # Counts are kept up to date by the incremental parser
+                    folders, files = self.parser.folders, self.parser.files
                     
                     # Update counters
                     self.folder_count.config(text=f"📁 {folders}", fg="#1976d2")
@@ -313,26 +326,23 @@ class FileStructureBuilderApp:
                     preview_lines.append("")
                     
                     # Add structure with emojis
-                    lines = cleaned_text.splitlines()
-                    for line in lines[:25]:
-                        if line.strip():
-                            # Clean the line to check content
-                            clean_part = line.replace("├──", "").replace("└──", "").replace("│", "").replace("─", "").strip()
-                            
-                            if clean_part.endswith('/'):
-                                # Folder
-                                if "📁" not in line:
-                                    line = line.replace(clean_part, f"📁 {clean_part}")
-                            elif '.' in clean_part:
-                                # File
-                                emoji = self.get_file_emoji(clean_part)
-                                if not any(e in line for e in ['📄', '🐍', '☕', '🌐', '🎨']):
-                                    line = line.replace(clean_part, f"{emoji} {clean_part}")
-                            
-                            preview_lines.append(line)
+                    for line, depth, name_offset, is_folder in self.parser.entries(25):
+                        label = line[name_offset:]
+                        
+                        if is_folder:
+                            # Folder
+                            if "📁" not in line:
+                                line = line[:name_offset] + f"📁 {label}"
+                        elif '.' in label:
+                            # File
+                            emoji = self.get_file_emoji(label)
+                            if not any(e in line for e in ['📄', '🐍', '☕', '🌐', '🎨']):
+                                line = line[:name_offset] + f"{emoji} {label}"
+                        
+                        preview_lines.append(line)
                     
-                    if len(lines) > 25:
-                        preview_lines.append(f"\n... {len(lines) - 25} more items")
+                    if len(self.parser) > 25:
+                        preview_lines.append(f"\n... {len(self.parser) - 25} more items")
                     
                     # Insert all content
                     self.preview_area.insert("1.0", "\n".join(preview_lines))
@@ -377,6 +387,23 @@ class FileStructureBuilderApp:
         except Exception as e:
             print(f"Preview error: {e}")
     
+    def update_changed_lines(self):
+        """Re-parse only the lines touched since the last keystroke"""
+        # Edits from the keyboard always end at the cursor, so the changed
+        # block is the cursor line plus any lines that were added or removed
+        cursor_line = int(self.text_area.index("insert").split(".")[0]) - 1
+        line_count = int(self.text_area.index("end-1c").split(".")[0])
+        delta = line_count - self.parser.line_count
+        
+        start = cursor_line - max(delta, 0)
+        stop = cursor_line + 1 - delta
+        if start < 0 or stop > self.parser.line_count:
+            self.parser.reset(self.text_area.get("1.0", "end-1c"))
+            return
+        
+        new_lines = self.text_area.get(f"{start + 1}.0", f"{cursor_line + 1}.end").split("\n")
+        self.parser.update(start, stop, new_lines)
+    
     def get_file_emoji(self, filename: str) -> str:
         """Get appropriate emoji for file type"""
         ext = filename.split('.')[-1].lower() if '.' in filename else ''
@@ -445,17 +472,21 @@ class FileStructureBuilderApp:
         except:
             pass
     
-    def build_in_thread(self):
+    def build_in_thread(self, tree):
         """Build structure in separate thread"""
-        structure_text = self.text_area.get("1.0", tk.END).strip()
-        
         try:
             self.root.after(0, lambda: self.status_label.config(text="🔄 Building structure...", fg="#ffc107"))
             
-            created_items = build_structure(self.output_dir, structure_text)
+            def show_progress(event):
+                text = f"🔄 Building structure... {event.done}/{event.total}"
+                self.root.after(0, lambda: self.status_label.config(text=text))
+            
+            # Journaled, so a build that dies half way picks up where it stopped next time
+            result = build_structure(self.output_dir, tree, workers=BUILD_WORKERS, journal=True,
+                                     progress=show_progress)
             
             # Success
-            success_msg = f"✅ Created {len(created_items)} items successfully!"
+            success_msg = f"✅ Created {result.total} items successfully!"
             self.root.after(0, lambda: self.status_label.config(text=success_msg, fg="#28a745"))
             self.root.after(0, self.play_success_sound)
             
@@ -468,13 +499,20 @@ class FileStructureBuilderApp:
             messagebox.showwarning("No Folder", "Please select a folder first!")
             return
         
-        structure_text = self.text_area.get("1.0", tk.END).strip()
-        if not structure_text:
+        # Reuse what the live preview already parsed instead of starting over,
+        # unless some edit slipped past it
+        if self.text_area.edit_modified():
+            self.on_text_change()
+        text = self.text_area.get("1.0", "end-1c")
+        if not self.parser.matches(text):
+            self.parser.reset(text)
+        if not len(self.parser):
             messagebox.showwarning("Empty", "Please paste your file structure!")
             return
+        tree = self.parser.tree()
         
         # Build in separate thread to avoid UI freezing
-        threading.Thread(target=self.build_in_thread, daemon=True).start()
+        threading.Thread(target=self.build_in_thread, args=(tree,), daemon=True).start()
     
     def center_window(self):
         """Center window on screen with better positioning"""
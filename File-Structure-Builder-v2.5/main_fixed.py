@@ -6,7 +6,8 @@ try:
     import winsound
 except ImportError:
     winsound = None
-from builder import build_structure, count_structure_items, clean_structure_text
+from builder import BUILD_WORKERS, build_structure
+from structure_parser import cached_parse
 from ai_assistant import ProjectStructureAI
 
 THEME = {
@@ -175,26 +176,25 @@ class FileStructureBuilderApp:
             self.preview_area.delete("1.0", tk.END)
             
             if text:
-                cleaned = clean_structure_text(text)
-                folders, files = count_structure_items(cleaned)
+                tree = cached_parse(text)
+                folders, files = tree.folders, tree.files
                 
                 self.folder_count.config(text=f"📁 {folders}", fg="#1976d2")
                 self.file_count.config(text=f"📄 {files}", fg="#1976d2")
                 
                 preview = f"📊 Preview: {folders} folders, {files} files\n" + "─" * 40 + "\n\n"
                 
-                for line in cleaned.splitlines()[:20]:
-                    if line.strip():
-                        clean_line = line.replace("├──", "").replace("└──", "").replace("│", "").strip()
-                        if clean_line.endswith('/'):
-                            preview += f"📁 {line}\n"
-                        elif '.' in clean_line:
-                            preview += f"📄 {line}\n"
-                        else:
-                            preview += f"{line}\n"
+                for index in range(min(len(tree), 20)):
+                    line = tree.lines[index]
+                    if tree.is_folder[index]:
+                        preview += f"📁 {line}\n"
+                    elif '.' in tree.label(index):
+                        preview += f"📄 {line}\n"
+                    else:
+                        preview += f"{line}\n"
                 
-                if len(cleaned.splitlines()) > 20:
-                    preview += f"\n... {len(cleaned.splitlines()) - 20} more"
+                if len(tree) > 20:
+                    preview += f"\n... {len(tree) - 20} more"
                 
                 self.preview_area.insert("1.0", preview)
                 self.status_label.config(text=f"✅ Ready: {folders} folders, {files} files", fg="#28a745")
@@ -238,8 +238,10 @@ class FileStructureBuilderApp:
         structure_text = self.text_area.get("1.0", tk.END).strip()
         try:
             self.root.after(0, lambda: self.status_label.config(text="🔄 Building...", fg="#ffc107"))
-            created_items = build_structure(self.output_dir, structure_text)
-            self.root.after(0, lambda: self.status_label.config(text=f"✅ Created {len(created_items)} items!", fg="#28a745"))
+            result = build_structure(self.output_dir, structure_text, workers=BUILD_WORKERS,
+                                     progress=lambda event: self.root.after(0, lambda: self.status_label.config(
+                                         text=f"🔄 Building... {event.done}/{event.total}")))
+            self.root.after(0, lambda: self.status_label.config(text=f"✅ Created {result.total} items!", fg="#28a745"))
             if winsound:
                 winsound.MessageBeep(winsound.MB_OK)
         except Exception as e:
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+
+# Lives in the root of the target folder
+MANIFEST_NAME = ".structure-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def relative_paths(order):
+    """Relative path of every node in a parents-first order, in the same order"""
+    paths = {}
+    out = []
+    for node in order:
+        parent = paths.get(node.parent, "")
+        path = os.path.join(parent, node.name) if parent else node.name
+        if node.is_folder:
+            paths[node] = path
+        out.append(path)
+    return out
+
+
+def spec_digest(order, paths) -> str:
+    """
+    Hash of what the spec builds, not of its text
+
+    Reformatting a spec (other tree glyphs, comments, spacing) keeps the
+    digest, so only real changes cost a diff.
+    """
+    digest = hashlib.sha256()
+    for node, path in zip(order, paths):
+        digest.update(b"D" if node.is_folder else b"F")
+        digest.update(path.encode("utf-8", "surrogateescape"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class Manifest:
+    """
+    What the last build put in a target: the spec digest plus
+    {relpath: [is_folder, inode, mtime_ns]} for every entry
+    """
+    __slots__ = ("digest", "entries")
+
+    def __init__(self, digest: str, entries=None):
+        self.digest = digest
+        self.entries = entries if entries is not None else {}
+
+    @classmethod
+    def load(cls, base_path: str):
+        """The manifest in ``base_path``, or None if there is no usable one"""
+        try:
+            with open(os.path.join(base_path, MANIFEST_NAME), "rb") as handle:
+                data = json.loads(handle.read())
+            if data.get("version") != MANIFEST_VERSION:
+                return None
+            return cls(data["digest"], {
+                path: [bool(is_folder), ino, mtime]
+                for path, is_folder, ino, mtime in data["entries"]
+            })
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def record(self, base_path: str, path: str, is_folder: bool, previous=None):
+        """Add an entry, reusing ``previous`` (an old manifest) instead of a stat if it has it"""
+        entry = previous.entries.get(path) if previous is not None else None
+        if entry is None or entry[0] != is_folder:
+            st = os.lstat(os.path.join(base_path, path))
+            entry = [is_folder, st.st_ino, st.st_mtime_ns]
+        self.entries[path] = entry
+
+    def save(self, base_path: str):
+        """Write the manifest atomically next to the entries it describes"""
+        data = {
+            "version": MANIFEST_VERSION,
+            "digest": self.digest,
+            "entries": [[path, int(e[0]), e[1], e[2]] for path, e in self.entries.items()],
+        }
+        target = os.path.join(base_path, MANIFEST_NAME)
+        temp = target + ".tmp"
+        with open(temp, "w", encoding="utf-8") as handle:
+            json.dump(data, handle, separators=(",", ":"))
+        os.replace(temp, target)
+
+    def remove_stale(self, base_path: str, keep) -> int:
+        """
+        Delete entries that are not in ``keep`` and were not touched since
+        they were recorded; returns how many were removed
+
+        Files must still have the recorded inode and mtime. Folders only
+        need the same inode (adding children changes their mtime) and are
+        left alone unless they are empty by then.
+        """
+        removed = 0
+        # Reverse order puts "a/b" ahead of "a", so children go first
+        for path in sorted(set(self.entries) - set(keep), reverse=True):
+            is_folder, ino, mtime = self.entries[path]
+            full_path = os.path.join(base_path, path)
+            try:
+                st = os.lstat(full_path)
+                if st.st_ino != ino:
+                    continue
+                if is_folder:
+                    os.rmdir(full_path)
+                elif st.st_mtime_ns == mtime:
+                    os.unlink(full_path)
+                else:
+                    continue
+            except OSError:
+                continue
+            removed += 1
+        return removed
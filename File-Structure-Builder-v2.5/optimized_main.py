@@ -7,7 +7,7 @@ try:
     import winsound
 except ImportError:
     winsound = None
-from builder import build_structure, count_structure_items, clean_structure_text
+from builder import BUILD_WORKERS, build_structure, preview_structure
 from enhanced_ai import EnhancedAI
 
 THEME = {
@@ -285,26 +285,18 @@ class OptimizedFileBuilder:
             self.preview_area.delete("1.0", tk.END)
             
             if text:
-                cleaned = clean_structure_text(text)
-                folders, files = count_structure_items(cleaned)
+                # Taken from the merged trie, so this is what will really exist on disk
+                result, lines = preview_structure(text, 25)
+                folders, files = result.folders, result.files
                 
                 self.folder_count.config(text=f"📁 {folders} Folders")
                 self.file_count.config(text=f"📄 {files} Files")
                 
                 preview = f"📊 Structure Overview\n{'─' * 40}\n\n"
+                preview += "\n".join(lines) + "\n"
                 
-                for line in cleaned.splitlines()[:25]:
-                    if line.strip():
-                        clean_line = line.replace("├──", "").replace("└──", "").replace("│", "").strip()
-                        if clean_line.endswith('/'):
-                            preview += f"📁 {line}\n"
-                        elif '.' in clean_line:
-                            preview += f"📄 {line}\n"
-                        else:
-                            preview += f"{line}\n"
-                
-                if len(cleaned.splitlines()) > 25:
-                    preview += f"\n... and {len(cleaned.splitlines()) - 25} more items"
+                if result.total > 25:
+                    preview += f"\n... and {result.total - 25} more items"
                 
                 self.preview_area.insert("1.0", preview)
                 self.status_label.config(text=f"✅ Structure ready: {folders} folders, {files} files", fg=THEME["success"])
@@ -349,10 +341,16 @@ class OptimizedFileBuilder:
             structure_text = self.text_area.get("1.0", tk.END).strip()
             self.root.after(0, lambda: self.status_label.config(text="🔄 Creating structure...", fg=THEME["warning"]))
             
-            created_items = build_structure(self.output_dir, structure_text)
+            def show_progress(event):
+                text = f"🔄 Creating structure... {event.done}/{event.total} ({event.fraction:.0%})"
+                self.root.after(0, lambda: self.status_label.config(text=text))
+            
+            # Journaled, so a build that dies half way picks up where it stopped next time
+            result = build_structure(self.output_dir, structure_text, workers=BUILD_WORKERS, journal=True,
+                                     progress=show_progress)
             
             self.root.after(0, lambda: self.status_label.config(
-                text=f"✅ Successfully created {len(created_items)} items!", fg=THEME["success"]))
+                text=f"✅ Successfully created {result.total} items!", fg=THEME["success"]))
             self.root.after(0, lambda: self.build_btn.config(text="🚀 Build Structure", bg=THEME["accent"]))
             
             if winsound:
@@ -0,0 +1,617 @@
+import mmap
+import os
+import re
+import sys
+from array import array
+from functools import lru_cache, partial
+from itertools import chain, islice
+from math import gcd
+
+# Characters that can appear in the tree prefix of a line; GNU `tree`
+# draws its continuation lines as "│\xa0\xa0 " (two non-breaking spaces)
+TREE_GLYPHS = "│├└─"
+PREFIX_CHARS = TREE_GLYPHS + " \t\xa0"
+
+# Spec dialects understood by the parser
+TREE = "tree"
+INDENT = "indent"
+TAB = "tab"
+MARKDOWN = "markdown"
+
+# Number of leading non-blank lines looked at to pick a dialect
+SAMPLE_LINES = 200
+
+# Number of distinct spec texts whose parsed trees are kept around
+PARSE_CACHE_SIZE = 16
+
+_COMMENT_RE = re.compile(r'\s*(<--|//|#).*$')
+_DESCRIPTION_RE = re.compile(r'\s*["\(].*?["\)]\s*$')
+_TREE_SUMMARY_RE = re.compile(r'^\d+ director(?:y|ies)(?:, \d+ files?)?$')
+_BULLETS = ('- ', '* ', '+ ')
+
+# Byte-level equivalents used when scanning a memory-mapped spec file
+_PREFIX_BYTES_RE = re.compile(rb'(?:[ \t]|\xc2\xa0|\xe2\x94[\x80\x82\x94\x9c])*')
+_COMMENT_BYTES_RE = re.compile(rb'\s*(<--|//|#).*$')
+_DESCRIPTION_BYTES_RE = re.compile(rb'\s*["\(].*?["\)]\s*$')
+_GLYPH_LEAD = b'\xe2\x94'
+_NBSP = b'\xc2\xa0'
+_BRANCHES = ("├".encode(), "└".encode())
+
+
+def clean_line(line: str) -> str:
+    """Strip HTML entities, comments and trailing descriptions from one line"""
+    if '&' in line:
+        line = line.replace('&lt;', '<').replace('&gt;', '>')
+
+    # Only pay for the regexes when the line can actually match them
+    if '#' in line or '//' in line or '<--' in line:
+        line = _COMMENT_RE.sub('', line)
+    if '"' in line or '(' in line:
+        line = _DESCRIPTION_RE.sub('', line)
+
+    return line.rstrip()
+
+
+def _find_branch(prefix: str) -> int:
+    """Position of the first ├ or └ in a line prefix, or -1"""
+    branch = prefix.find("├")
+    corner = prefix.find("└")
+    if branch == -1 or (corner != -1 and corner < branch):
+        return corner
+    return branch
+
+
+def _tokenize_tree(line: str, width: int):
+    """Depth from the column of the ├/└ glyph, as drawn by `tree` and AI output"""
+    name_offset = len(line) - len(line.lstrip(PREFIX_CHARS))
+    branch = _find_branch(line[:name_offset])
+    if branch == -1:
+        return name_offset // width, name_offset
+    return branch // width + 1, name_offset
+
+
+def _tokenize_indent(line: str, width: int):
+    """Depth from a fixed number of leading spaces"""
+    name_offset = len(line) - len(line.lstrip(' \t'))
+    return name_offset // width, name_offset
+
+
+def _tokenize_tab(line: str, width: int):
+    """Depth from the number of leading tabs"""
+    name_offset = len(line) - len(line.lstrip(' \t'))
+    return len(line) - len(line.lstrip('\t')), name_offset
+
+
+def _tokenize_markdown(line: str, width: int):
+    """Depth from the indentation of a markdown bullet"""
+    indent = len(line) - len(line.lstrip(' \t'))
+    name_offset = indent
+    if line[indent:indent + 2] in _BULLETS:
+        name_offset = len(line) - len(line[indent + 2:].lstrip(' '))
+    return indent // width, name_offset
+
+
+_TOKENIZERS = {
+    TREE: _tokenize_tree,
+    INDENT: _tokenize_indent,
+    TAB: _tokenize_tab,
+    MARKDOWN: _tokenize_markdown,
+}
+
+
+class Dialect:
+    """How a spec encodes nesting, with the tokenizer specialised for it"""
+
+    __slots__ = ("kind", "width", "tokenize")
+
+    def __init__(self, kind: str = TREE, width: int = 4):
+        self.kind = kind
+        self.width = width
+        self.tokenize = partial(_TOKENIZERS[kind], width=width)
+
+    def __repr__(self):
+        return f"Dialect({self.kind!r}, {self.width})"
+
+
+def detect_dialect(lines) -> Dialect:
+    """Pick the spec dialect from the first SAMPLE_LINES non-blank lines"""
+    branch_columns = []
+    bullet_indents = []
+    indents = []
+    has_branch = False
+    has_tabs = False
+    sampled = 0
+
+    for raw_line in lines:
+        line = clean_line(raw_line)
+        if not line:
+            continue
+        sampled += 1
+        if sampled > SAMPLE_LINES:
+            break
+
+        stripped = line.lstrip(' \t')
+        indent = len(line) - len(stripped)
+        branch = _find_branch(line[:len(line) - len(line.lstrip(PREFIX_CHARS))])
+
+        if branch != -1:
+            has_branch = True
+            if branch:
+                branch_columns.append(branch)
+        elif stripped[:2] in _BULLETS:
+            bullet_indents.append(indent)
+        if '\t' in line[:indent]:
+            has_tabs = True
+        if indent:
+            indents.append(indent)
+
+    if has_branch:
+        return Dialect(TREE, min(branch_columns, default=4))
+    if bullet_indents:
+        return Dialect(MARKDOWN, min((i for i in bullet_indents if i), default=2))
+    if has_tabs:
+        return Dialect(TAB, 1)
+
+    width = 0
+    for indent in indents:
+        width = gcd(width, indent)
+    return Dialect(INDENT, width or 4)
+
+
+# Used when there is nothing to sample, e.g. an empty editor
+DEFAULT_DIALECT = Dialect(TREE, 4)
+
+
+class StructureTree:
+    """Compact array-backed tree produced by a single tokenizer pass.
+
+    Entry ``i`` is described by ``lines[i]`` (the cleaned source line) and the
+    parallel arrays ``parents``, ``depths``, ``name_offsets`` and ``is_folder``.
+    A parent of -1 means the entry sits directly in the base path.
+    """
+
+    __slots__ = ("lines", "parents", "depths", "name_offsets", "is_folder", "folders", "files", "_trie")
+
+    def __init__(self):
+        self.lines = []
+        self.parents = array('i')
+        self.depths = array('i')
+        self.name_offsets = array('i')
+        self.is_folder = bytearray()
+        self.folders = 0
+        self.files = 0
+        self._trie = None
+
+    def __len__(self):
+        return len(self.lines)
+
+    def name(self, index: int) -> str:
+        """Entry name without the tree prefix or trailing slash"""
+        return self.lines[index][self.name_offsets[index]:].rstrip('/')
+
+    def label(self, index: int) -> str:
+        """Entry name as written, keeping the trailing slash of folders"""
+        return self.lines[index][self.name_offsets[index]:]
+
+    def prefix(self, index: int) -> str:
+        """Tree glyphs and indentation in front of the entry name"""
+        return self.lines[index][:self.name_offsets[index]]
+
+    def trie(self) -> "StructureTrie":
+        """Path-segment trie of this tree, built on first use and then kept"""
+        if self._trie is None:
+            trie = StructureTrie()
+            nodes = []
+            parents = self.parents
+            is_folder = self.is_folder
+            for index in range(len(self.lines)):
+                parent = parents[index]
+                parent_node = nodes[parent] if parent != -1 else trie.root
+                name = self.name(index)
+                if '/' in name:
+                    # "src/utils/helpers.py" on one line is several segments
+                    *folders, name = name.split('/')
+                    for folder in folders:
+                        if folder:
+                            parent_node = trie.add(parent_node, folder, True)
+                if not name:
+                    # A bare "/" names nothing; anything below it goes in the parent
+                    nodes.append(parent_node)
+                    continue
+                nodes.append(trie.add(parent_node, name, is_folder[index]))
+            self._trie = trie
+        return self._trie
+
+
+class PathNode:
+    """One folder or file of a StructureTrie.
+
+    Only the interned segment name is stored; the full path is put together
+    by ``path()`` when a syscall actually needs it.
+    """
+
+    __slots__ = ("name", "parent", "children", "depth")
+
+    def __init__(self, name: str, parent, is_folder: bool):
+        self.name = name
+        self.parent = parent
+        # Child name -> node for folders, None for files
+        self.children = {} if is_folder else None
+        self.depth = parent.depth + 1 if parent is not None else 0
+
+    @property
+    def is_folder(self) -> bool:
+        return self.children is not None
+
+    def path(self, base_path: str = "") -> str:
+        """Full path of this node below ``base_path``"""
+        names = []
+        node = self
+        while node.parent is not None:
+            names.append(node.name)
+            node = node.parent
+        names.reverse()
+        return os.path.join(base_path, *names)
+
+    def __repr__(self):
+        return f"PathNode({self.path()!r}{'/' if self.is_folder else ''})"
+
+
+class StructureTrie:
+    """Parsed structure as a trie of path segments below an unnamed root.
+
+    Repeated folder names share one interned string, and an entry listed
+    twice under the same parent is stored once.
+    """
+
+    __slots__ = ("root", "folders", "files")
+
+    def __init__(self):
+        self.root = PathNode("", None, True)
+        self.folders = 0
+        self.files = 0
+
+    def __len__(self):
+        return self.folders + self.files
+
+    def add(self, parent: PathNode, name: str, is_folder: bool) -> PathNode:
+        """Add ``name`` under ``parent`` (or return the node already there)"""
+        node = parent.children.get(name)
+        if node is None:
+            node = PathNode(sys.intern(name), parent, is_folder)
+            parent.children[node.name] = node
+            if is_folder:
+                self.folders += 1
+            else:
+                self.files += 1
+        elif is_folder and node.children is None:
+            node.children = {}
+            self.folders += 1
+            self.files -= 1
+        return node
+
+    def walk(self):
+        """Yield every node in pre-order, parents before their children"""
+        stack = [iter(self.root.children.values())]
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                continue
+            yield node
+            if node.children:
+                stack.append(iter(node.children.values()))
+
+
+def tokenize_entry(raw_line: str, dialect: Dialect = DEFAULT_DIALECT):
+    """Return (line, depth, name_offset, is_folder) for one raw line, or None"""
+    line = clean_line(raw_line)
+    if not line:
+        return None
+    if dialect.kind == MARKDOWN and ('`' in line or '**' in line):
+        line = line.replace('`', '').replace('**', '')
+
+    depth, name_offset = dialect.tokenize(line)
+    name = line[name_offset:]
+    if not name or name == '.' or name == './':
+        # Nothing but tree glyphs, or the `tree` root marker
+        return None
+    if dialect.kind == TREE and _TREE_SUMMARY_RE.match(name):
+        return None
+
+    return line, depth, name_offset, line.endswith('/')
+
+
+def iter_tokens(lines, dialect: Dialect = None):
+    """Yield (line, depth, name_offset, is_folder) for every entry line.
+
+    ``lines`` can be any iterable of strings, including an open text file,
+    so nothing beyond the current line is held in memory. Without an explicit
+    dialect one is detected from a prefix of the input.
+    """
+    lines = iter(lines)
+    if dialect is None:
+        sample = list(islice(lines, SAMPLE_LINES))
+        dialect = detect_dialect(sample)
+        lines = chain(sample, lines)
+
+    for raw_line in lines:
+        token = tokenize_entry(raw_line, dialect)
+        if token is not None:
+            yield token
+
+
+def tree_from_tokens(tokens) -> StructureTree:
+    """Link a stream of entry tokens into a StructureTree.
+
+    The parent of an entry is the closest preceding entry that is less deeply
+    nested; an entry without a trailing slash that gets children is a folder.
+    """
+    tree = StructureTree()
+    lines = tree.lines
+    parents = tree.parents
+    depths = tree.depths
+    name_offsets = tree.name_offsets
+    is_folder = tree.is_folder
+    stack = []
+
+    for line, depth, name_offset, folder in tokens:
+        while stack and depths[stack[-1]] >= depth:
+            stack.pop()
+        parent = stack[-1] if stack else -1
+        if parent != -1 and not is_folder[parent]:
+            is_folder[parent] = 1
+            tree.folders += 1
+            tree.files -= 1
+
+        stack.append(len(lines))
+        lines.append(line)
+        parents.append(parent)
+        depths.append(depth)
+        name_offsets.append(name_offset)
+        is_folder.append(folder)
+
+        if folder:
+            tree.folders += 1
+        else:
+            tree.files += 1
+
+    return tree
+
+
+def parse_structure(structure_text: str, dialect: Dialect = None) -> StructureTree:
+    """Clean, tokenize and link every line of the structure in one pass"""
+    return tree_from_tokens(iter_tokens(structure_text.splitlines(), dialect))
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def cached_parse(structure_text: str) -> StructureTree:
+    """parse_structure behind a bounded LRU cache keyed by the spec text.
+
+    Lookups cost one string hash (cached on the str object) plus a compare
+    on a hit. The returned tree is shared between callers and must be
+    treated as read-only.
+    """
+    return parse_structure(structure_text)
+
+
+def _count_kinds(tokens, next_depth: int):
+    """(folders, files) among ``tokens`` given the depth of the entry after them"""
+    folders = 0
+    files = 0
+    for token in reversed(tokens):
+        if token is None:
+            continue
+        if token[3] or next_depth > token[1]:
+            folders += 1
+        else:
+            files += 1
+        next_depth = token[1]
+    return folders, files
+
+
+class IncrementalParser:
+    """Keeps the parse state of every text line so edits only re-tokenize what changed.
+
+    Depth and trailing slash depend only on the line itself; whether a line
+    without a slash is a folder depends only on the next entry. Replacing a
+    range of lines therefore only touches that range and the entry before it.
+    Parent links are resolved lazily by ``tree()`` when a full StructureTree
+    is actually needed.
+    """
+
+    def __init__(self, structure_text: str = ""):
+        self.reset(structure_text)
+
+    def __len__(self):
+        return self.folders + self.files
+
+    @property
+    def line_count(self):
+        return len(self.tokens)
+
+    def reset(self, structure_text: str):
+        """Throw away all state and parse the whole text again"""
+        self._retokenize(structure_text.split('\n'))
+
+    def _retokenize(self, lines):
+        self._tree = None
+        # Raw text lines, kept so matches() is a plain comparison
+        self.lines = lines
+        self.dialect = detect_dialect(lines) if any(line.strip() for line in lines) else DEFAULT_DIALECT
+        self.tokens = [tokenize_entry(line, self.dialect) for line in lines]
+        self.folders, self.files = _count_kinds(self.tokens, -1)
+
+    def matches(self, structure_text: str) -> bool:
+        """Whether the state is still exactly that of ``structure_text``
+
+        Edits that never reached ``update()`` (or reached it with the wrong
+        range) show up here; nothing is tokenized to find out.
+        """
+        return structure_text.split('\n') == self.lines
+
+    def update(self, start: int, stop: int, new_lines):
+        """Replace text lines [start, stop) with ``new_lines`` and re-tokenize only those"""
+        tokens = self.tokens
+        self._tree = None
+        if len(tokens) - (stop - start) + len(new_lines) <= SAMPLE_LINES:
+            # Short texts are cheap to re-sample, so a spec typed by hand
+            # settles on the right dialect as soon as its shape is clear
+            lines = self.lines
+            lines[start:stop] = new_lines
+            self._retokenize(lines)
+            return
+
+        dialect = self.dialect
+        if dialect.kind == INDENT and any("├" in line or "└" in line for line in new_lines):
+            # Tree glyphs typed into a plain indented spec; the tree tokenizer
+            # reads indentation the same way, so earlier lines stay valid
+            dialect = self.dialect = Dialect(TREE, dialect.width)
+
+        before = start - 1
+        while before >= 0 and tokens[before] is None:
+            before -= 1
+        after = stop
+        while after < len(tokens) and tokens[after] is None:
+            after += 1
+        next_depth = tokens[after][1] if after < len(tokens) else -1
+        head = [tokens[before]] if before >= 0 else []
+
+        folders, files = _count_kinds(head + tokens[start:stop], next_depth)
+        self.folders -= folders
+        self.files -= files
+
+        new_tokens = [tokenize_entry(line, dialect) for line in new_lines]
+        folders, files = _count_kinds(head + new_tokens, next_depth)
+        self.folders += folders
+        self.files += files
+
+        tokens[start:stop] = new_tokens
+        self.lines[start:stop] = new_lines
+
+    def entries(self, limit: int = None):
+        """Yield up to ``limit`` entry tokens from the top of the text"""
+        count = 0
+        previous = None
+        for token in self.tokens:
+            if token is None:
+                continue
+            if previous is not None:
+                if limit is not None and count >= limit:
+                    return
+                count += 1
+                if not previous[3] and token[1] > previous[1]:
+                    previous = previous[:3] + (True,)
+                yield previous
+            previous = token
+        if previous is not None and (limit is None or count < limit):
+            yield previous
+
+    def tree(self) -> StructureTree:
+        """Resolve parents and return the current text as a StructureTree.
+
+        The tree is kept until the next edit, so asking again is free.
+        """
+        if self._tree is None:
+            self._tree = tree_from_tokens(token for token in self.tokens if token is not None)
+        return self._tree
+
+
+def _iter_paths(tokens):
+    """Turn (line, depth, name_offset, is_folder) tokens into relative paths.
+
+    Each entry is held back until the next one arrives, so an entry that
+    turns out to have children can still be reported as a folder.
+    """
+    # (depth, relative path) of each open entry, so every entry costs a single join
+    stack = []
+    pending = None
+
+    for line, depth, name_offset, folder in tokens:
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        if pending is not None:
+            yield pending[0], pending[1] or depth > pending[2]
+
+        name = line[name_offset:].rstrip('/')
+        path = os.path.join(stack[-1][1], name) if stack else name
+        stack.append((depth, path))
+        pending = (path, folder, depth)
+
+    if pending is not None:
+        yield pending[0], pending[1]
+
+
+def iter_structure(lines, dialect: Dialect = None):
+    """Lazily yield (relative_path, is_folder) entries from a line iterable"""
+    return _iter_paths(iter_tokens(lines, dialect))
+
+
+def iter_mmap_tokens(buffer, dialect: Dialect):
+    """Yield (name, depth, 0, is_folder) tokens straight from a bytes-like buffer.
+
+    Newlines, tree glyphs and comments are found on the raw bytes and only the
+    entry name itself is decoded. Dialects other than tree output decode each
+    line and go through the regular tokenizer.
+    """
+    pos = 0
+    size = len(buffer)
+    width = dialect.width
+    if buffer[:3] == b'\xef\xbb\xbf':
+        pos = 3
+
+    while pos < size:
+        end = buffer.find(b'\n', pos)
+        if end == -1:
+            end = size
+        raw = buffer[pos:end]
+        pos = end + 1
+
+        if dialect.kind != TREE:
+            token = tokenize_entry(raw.decode('utf-8', errors='replace'), dialect)
+            if token is not None:
+                yield token
+            continue
+
+        name_offset = _PREFIX_BYTES_RE.match(raw).end()
+        body = raw[name_offset:]
+        if b'&' in body:
+            body = body.replace(b'&lt;', b'<').replace(b'&gt;', b'>')
+        if b'#' in body or b'//' in body or b'<--' in body:
+            body = _COMMENT_BYTES_RE.sub(b'', body)
+        if b'"' in body or b'(' in body:
+            body = _DESCRIPTION_BYTES_RE.sub(b'', body)
+        body = body.rstrip()
+        if not body or body == b'.' or body == b'./':
+            continue
+
+        # Glyphs are three bytes and NBSPs two, but each is one column wide
+        prefix = raw[:name_offset]
+        branch = -1
+        for glyph in _BRANCHES:
+            found = prefix.find(glyph)
+            if found != -1 and (branch == -1 or found < branch):
+                branch = found
+        if branch == -1:
+            depth = (name_offset - 2 * prefix.count(_GLYPH_LEAD) - prefix.count(_NBSP)) // width
+        else:
+            depth = (branch - 2 * prefix.count(_GLYPH_LEAD, 0, branch) - prefix.count(_NBSP, 0, branch)) // width + 1
+
+        name = body.decode('utf-8', errors='replace')
+        if _TREE_SUMMARY_RE.match(name):
+            continue
+        yield name, depth, 0, name.endswith('/')
+
+
+def iter_structure_file(spec_path: str, dialect: Dialect = None):
+    """Lazily yield (relative_path, is_folder) entries from a memory-mapped spec file"""
+    with open(spec_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            if hasattr(buffer, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                buffer.madvise(mmap.MADV_SEQUENTIAL)
+            if dialect is None:
+                sample = buffer[:64 * 1024].decode('utf-8', errors='ignore')
+                dialect = detect_dialect(sample.splitlines())
+            yield from _iter_paths(iter_mmap_tokens(buffer, dialect))
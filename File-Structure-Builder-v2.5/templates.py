@@ -0,0 +1,101 @@
+import os
+import re
+
+# Starter content for new files, by extension. Placeholders:
+#   {{project}}  name of the folder being built into
+#   {{name}}     file name ("app.py")
+#   {{stem}}     file name without extension ("app")
+#   {{ext}}      extension (".py")
+#   {{path}}     path inside the project ("src/app.py")
+FILE_TEMPLATES = {
+    ".py": '"""{{stem}} module of {{project}}"""\n',
+    ".md": "# {{stem}}\n",
+    ".txt": "",
+    ".html": (
+        "<!DOCTYPE html>\n"
+        "<html lang=\"en\">\n"
+        "<head>\n"
+        "    <meta charset=\"UTF-8\">\n"
+        "    <meta name=\"viewport\" content=\"width=device-width, initial-scale=1.0\">\n"
+        "    <title>{{project}}</title>\n"
+        "</head>\n"
+        "<body>\n"
+        "</body>\n"
+        "</html>\n"
+    ),
+    ".css": "/* {{path}} */\n",
+    ".js": "// {{path}}\n",
+    ".jsx": "// {{path}}\n",
+    ".ts": "// {{path}}\n",
+    ".tsx": "// {{path}}\n",
+    ".json": "{}\n",
+    ".yml": "# {{path}}\n",
+    ".yaml": "# {{path}}\n",
+    ".toml": "# {{path}}\n",
+    ".sh": "#!/bin/sh\n# {{path}}\n",
+    ".sql": "-- {{path}}\n",
+}
+
+SLOTS = ("project", "name", "stem", "ext", "path")
+# Only known slots are placeholders; any other {{...}} is kept as written
+SLOT_RE = re.compile(r"\{\{\s*(" + "|".join(SLOTS) + r")\s*\}\}")
+
+
+class CompiledTemplate:
+    """
+    A template split once into encoded literal chunks and the slots
+    between them, so rendering is a single bytes join
+    """
+    __slots__ = ("chunks", "slots", "static")
+
+    def __init__(self, text: str):
+        parts = SLOT_RE.split(text)
+        # split() alternates literal, slot, literal, ... and ends on a literal
+        self.chunks = [part.encode("utf-8") for part in parts[0::2]]
+        self.slots = parts[1::2]
+        # Templates without slots render to the same bytes object every time
+        self.static = self.chunks[0] if not self.slots else None
+
+    def render(self, values) -> bytes:
+        """``values`` maps each slot name to its encoded value"""
+        if self.static is not None:
+            return self.static
+        out = [self.chunks[0]]
+        for slot, chunk in zip(self.slots, self.chunks[1:]):
+            out.append(values[slot])
+            out.append(chunk)
+        return b"".join(out)
+
+
+class TemplateSet:
+    """FILE_TEMPLATES (or any extension -> text map) compiled for one build"""
+    __slots__ = ("compiled", "project")
+
+    def __init__(self, templates=None, project: str = ""):
+        if templates is None:
+            templates = FILE_TEMPLATES
+        self.compiled = {ext.lower(): CompiledTemplate(text) for ext, text in templates.items()}
+        self.project = project.encode("utf-8")
+
+    def render(self, name: str, path="") -> bytes:
+        """
+        Body for a new file called ``name``
+
+        ``path`` is its path inside the project, or a function returning it,
+        so it is only worked out for templates that actually use it.
+        """
+        stem, ext = os.path.splitext(name)
+        template = self.compiled.get(ext.lower())
+        if template is None:
+            return b''
+        if template.static is not None:
+            return template.static
+        if callable(path):
+            path = path()
+        return template.render({
+            "project": self.project,
+            "name": name.encode("utf-8"),
+            "stem": stem.encode("utf-8"),
+            "ext": ext.encode("utf-8"),
+            "path": (path or name).encode("utf-8"),
+        })
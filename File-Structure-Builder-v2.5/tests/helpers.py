@@ -0,0 +1,45 @@
+"""Shared fixtures for the tests; importing this also puts the app modules on sys.path"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import JOURNAL_NAME
+from manifest import MANIFEST_NAME
+
+
+def make_spec(groups: int = 12, files: int = 20) -> str:
+    """A few hundred entries, enough for the threaded engine to cut levels into several chunks"""
+    lines = []
+    for group in range(groups):
+        lines.append(f"pkg{group}/")
+        lines.append("    __init__.py")
+        lines.append("    sub/")
+        lines.extend(f"        mod{index}.py" for index in range(files))
+    lines.append("README.md")
+    return "\n".join(lines)
+
+
+SPEC = make_spec()
+
+
+def snapshot(base_path: str, skip=(JOURNAL_NAME, MANIFEST_NAME)):
+    """{relative path: file bytes, or None for folders} of everything below ``base_path``"""
+    out = {}
+    for root, dirs, files in os.walk(base_path):
+        for name in dirs:
+            out[os.path.relpath(os.path.join(root, name), base_path)] = None
+        for name in files:
+            if name in skip:
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as handle:
+                out[os.path.relpath(path, base_path)] = handle.read()
+    return out
+
+
+def write_spec(folder: str, text: str, name: str = "spec.txt", encoding: str = "utf-8") -> str:
+    path = os.path.join(folder, name)
+    with open(path, "w", encoding=encoding, newline="") as handle:
+        handle.write(text)
+    return path
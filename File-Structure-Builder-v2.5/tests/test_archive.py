@@ -0,0 +1,83 @@
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+from helpers import SPEC
+
+import backends
+from backends import archive_format
+from builder import build_archive, plan_build
+from templates import TemplateSet
+
+SMALL_SPEC = "src/\n    app.py\n    util/\nREADME.md"
+SMALL_NAMES = ["demo", "demo/src", "demo/src/app.py", "demo/src/util", "demo/README.md"]
+
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_format_from_the_name(self):
+        self.assertEqual(archive_format("out.tar.gz"), "tar.gz")
+        self.assertEqual(archive_format("OUT.ZIP"), "zip")
+        self.assertEqual(archive_format("out.tgz"), "tgz")
+        self.assertEqual(archive_format("out.bin"), "tar")
+
+    def test_tar_formats(self):
+        for suffix in ("tar", "tar.gz", "tar.bz2", "tar.xz"):
+            with self.subTest(suffix):
+                path = os.path.join(self.tmp.name, f"out.{suffix}")
+                result = build_archive(path, SMALL_SPEC, "demo", templates=TemplateSet(project="demo"))
+                self.assertEqual((result.folders, result.files), (2, 2))
+                with tarfile.open(path) as archive:
+                    self.assertEqual(archive.getnames(), SMALL_NAMES)
+                    self.assertTrue(archive.getmember("demo/src/util").isdir())
+                    body = archive.extractfile("demo/src/app.py").read()
+                self.assertEqual(body, b'"""app module of demo"""\n')
+
+    def test_zip(self):
+        path = os.path.join(self.tmp.name, "out.zip")
+        build_archive(path, SMALL_SPEC, "demo")
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+            self.assertEqual(names, ["demo/", "demo/src/", "demo/src/app.py", "demo/src/util/", "demo/README.md"])
+            self.assertTrue(archive.getinfo("demo/src/").is_dir())
+
+    def test_no_top_folder(self):
+        stream = io.BytesIO()
+        build_archive(stream, SMALL_SPEC, fmt="tar")
+        with tarfile.open(fileobj=io.BytesIO(stream.getvalue())) as archive:
+            self.assertEqual(archive.getnames()[0], "src")
+
+    def test_stdout(self):
+        stdout = mock.Mock()
+        stdout.buffer = io.BytesIO()
+        with mock.patch.object(sys, "stdout", stdout):
+            result = build_archive("-", SPEC, "demo")
+        self.assertEqual(result.total, len(plan_build(SPEC).order))
+        with tarfile.open(fileobj=io.BytesIO(stdout.buffer.getvalue())) as archive:
+            self.assertEqual(len(archive.getnames()), result.total + 1)
+
+    def test_zstd_without_the_package(self):
+        path = os.path.join(self.tmp.name, "out.tar.zst")
+        with mock.patch.object(backends, "zstandard", None):
+            with self.assertRaises(RuntimeError):
+                build_archive(path, SMALL_SPEC)
+        # Refused before the output was created
+        self.assertFalse(os.path.exists(path))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            build_archive(io.BytesIO(), SMALL_SPEC, fmt="rar")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from helpers import SPEC, snapshot
+
+import builder
+from builder import build_structure, build_structure_async, plan_build
+
+
+class AsyncEngineTest(unittest.TestCase):
+    def test_matches_the_serial_build(self):
+        with tempfile.TemporaryDirectory() as serial, tempfile.TemporaryDirectory() as awaited:
+            build_structure(serial, SPEC)
+            result = asyncio.run(build_structure_async(awaited, SPEC, concurrency=8))
+            self.assertEqual(snapshot(serial), snapshot(awaited))
+            plan = plan_build(SPEC)
+            self.assertEqual((result.folders, result.files, result.existing), (plan.dirs, plan.files, 0))
+
+    def test_rebuild_finds_everything(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(build_structure_async(tmp, SPEC))
+            result = asyncio.run(build_structure_async(tmp, SPEC, concurrency=2))
+            self.assertEqual(result.existing, len(plan_build(SPEC).order))
+
+    def test_error_is_raised_after_the_queue_drains(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # A file where the spec wants a folder
+            with open(os.path.join(tmp, "a"), "w"):
+                pass
+            with self.assertRaises(OSError):
+                asyncio.run(build_structure_async(tmp, "a/\n    b\nc/\n    d"))
+            self.assertTrue(os.path.isdir(os.path.join(tmp, "c")))
+
+    def test_unusable_target(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "file"), "w"):
+                pass
+            with self.assertRaises(OSError):
+                asyncio.run(build_structure_async(os.path.join(tmp, "file", "x"), "a/"))
+
+    def test_cancel_stops_the_build(self):
+        place_node = builder.place_node
+
+        def slow_place_node(*args):
+            time.sleep(0.01)
+            return place_node(*args)
+
+        async def build_then_cancel(target):
+            task = asyncio.ensure_future(build_structure_async(target, SPEC, concurrency=2))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(builder, "place_node", slow_place_node):
+            asyncio.run(build_then_cancel(tmp))
+            # Give operations already on the executor time to finish
+            time.sleep(0.1)
+            self.assertLess(len(snapshot(tmp)), len(plan_build(SPEC).order))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from helpers import snapshot, write_spec
+
+from builder import main
+
+BOM_SPEC = "app/\n    main.py\nREADME.md\n"
+
+
+class CommandLineTest(unittest.TestCase):
+    def run_main(self, *argv):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(list(argv)), 0)
+        return out.getvalue()
+
+    def test_bom_is_dropped_on_every_path(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            spec = write_spec(tmp, BOM_SPEC, encoding="utf-8-sig")
+            trees = []
+            for name, flags in (("plain", ()), ("threads", ("-j", "2")), ("templates", ("-t",))):
+                target = os.path.join(tmp, name)
+                self.run_main(spec, target, *flags)
+                trees.append(sorted(snapshot(target)))
+            self.assertEqual(trees[0], ["README.md", "app", os.path.join("app", "main.py")])
+            self.assertEqual(trees[0], trees[1])
+            self.assertEqual(trees[0], trees[2])
+
+    def test_reports_what_it_created(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            spec = write_spec(tmp, BOM_SPEC)
+            out = self.run_main(spec, os.path.join(tmp, "out"), "-j", "2")
+            self.assertIn("1 folders, 2 files", out)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import errno
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import helpers  # noqa: F401  (puts the app on sys.path)
+
+import backends
+from backends import CLONE_MIN_SIZE, MAX_SOURCES, ContentStore
+
+BIG = b"x" * (CLONE_MIN_SIZE * 2)
+
+
+class ContentStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.tmp.name, name)
+
+    def read(self, name: str) -> bytes:
+        with open(self.path(name), "rb") as handle:
+            return handle.read()
+
+    def write_copies(self, store, data: bytes, count: int = 4):
+        for index in range(count):
+            self.assertTrue(store.create(self.path(f"f{index}"), data))
+        self.assertFalse(store.create(self.path("f0"), data))
+        for index in range(count):
+            self.assertEqual(self.read(f"f{index}"), data)
+
+    def test_repeated_body_gets_one_source(self):
+        store = ContentStore()
+        self.write_copies(store, BIG)
+        self.assertEqual(len(store._sources), 1)
+        store.close()
+        self.assertEqual(store._sources, {})
+
+    def test_bodies_seen_once_hold_nothing_open(self):
+        store = ContentStore(hardlink=True)
+        for index in range(50):
+            store.create(self.path(f"f{index}"), f"body {index}".encode())
+        self.assertEqual(store._sources, {})
+        store.close()
+
+    def test_sources_are_capped(self):
+        store = ContentStore(hardlink=True)
+        for index in range(MAX_SOURCES + 10):
+            body = f"body {index}".encode()
+            store.create(self.path(f"a{index}"), body)
+            store.create(self.path(f"b{index}"), body)
+        self.assertEqual(len(store._sources), MAX_SOURCES)
+        store.close()
+
+    def test_small_bodies_are_plain_writes(self):
+        store = ContentStore()
+        self.write_copies(store, b"small")
+        self.assertEqual(store._sources, {})
+
+    def test_copy_file_range_failure_falls_back_to_write(self):
+        store = ContentStore()
+        store._can_reflink = False
+        with mock.patch.object(backends.os, "copy_file_range", side_effect=OSError(errno.EXDEV, "cross device"),
+                               create=True):
+            store._can_copy_range = True
+            self.write_copies(store, BIG)
+        self.assertFalse(store._can_copy_range)
+        store.close()
+
+    def test_no_clone_support_writes_the_bytes(self):
+        store = ContentStore()
+        store._can_reflink = store._can_copy_range = False
+        self.write_copies(store, BIG)
+        store.close()
+
+    def test_hardlinks_share_the_inode(self):
+        store = ContentStore(hardlink=True)
+        self.write_copies(store, b"shared body")
+        inodes = {os.stat(self.path(f"f{index}")).st_ino for index in range(1, 4)}
+        self.assertEqual(len(inodes), 1)
+        store.close()
+
+    def test_failed_link_falls_back_to_a_copy(self):
+        store = ContentStore(hardlink=True)
+        with mock.patch.object(backends.os, "link", side_effect=OSError(errno.EMLINK, "too many links")):
+            self.write_copies(store, b"shared body")
+        inodes = {os.stat(self.path(f"f{index}")).st_ino for index in range(4)}
+        self.assertEqual(len(inodes), 4)
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
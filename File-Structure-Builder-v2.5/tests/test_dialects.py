@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+
+from helpers import write_spec
+
+from structure_parser import INDENT, MARKDOWN, TAB, TREE, cached_parse, detect_dialect, iter_structure_file
+
+# The same project in every dialect the parser understands
+EXPECTED = [
+    "my-app/",
+    "my-app/README.md",
+    "my-app/src/",
+    "my-app/src/components/",
+    "my-app/src/components/Header.jsx",
+    "my-app/src/index.js",
+    "my-app/package.json",
+]
+
+DIALECTS = {
+    TREE: (
+        "my-app/\n"
+        "├── README.md  # docs\n"
+        "├── src/\n"
+        "│   ├── components/\n"
+        "│   │   └── Header.jsx\n"
+        "│   └── index.js (entry point)\n"
+        "└── package.json\n"
+    ),
+    INDENT: (
+        "my-app/\n"
+        "  README.md\n"
+        "  src/\n"
+        "    components/\n"
+        "      Header.jsx\n"
+        "    index.js\n"
+        "  package.json\n"
+    ),
+    TAB: (
+        "my-app/\n"
+        "\tREADME.md\n"
+        "\tsrc/\n"
+        "\t\tcomponents/\n"
+        "\t\t\tHeader.jsx\n"
+        "\t\tindex.js\n"
+        "\tpackage.json\n"
+    ),
+    # What GNU `tree my-app` prints in a UTF-8 locale: continuation lines
+    # use non-breaking spaces, folders have no slash, and a summary follows
+    "gnu-tree": (
+        "my-app\n"
+        "├── README.md\n"
+        "├── src\n"
+        "│\xa0\xa0 ├── components\n"
+        "│\xa0\xa0 │\xa0\xa0 └── Header.jsx\n"
+        "│\xa0\xa0 └── index.js\n"
+        "└── package.json\n"
+        "\n"
+        "2 directories, 4 files\n"
+    ),
+    MARKDOWN: (
+        "- my-app/\n"
+        "  - README.md\n"
+        "  - src/\n"
+        "    - components/\n"
+        "      - Header.jsx\n"
+        "    - index.js\n"
+        "  - package.json\n"
+    ),
+}
+
+
+def tree_paths(tree):
+    return [node.path().replace(os.sep, "/") + ("/" if node.is_folder else "") for node in tree.trie().walk()]
+
+
+class DialectParityTest(unittest.TestCase):
+    def test_dialect_is_detected(self):
+        for kind, text in DIALECTS.items():
+            with self.subTest(kind):
+                expected = TREE if kind == "gnu-tree" else kind
+                self.assertEqual(detect_dialect(text.splitlines()).kind, expected)
+
+    def test_every_dialect_gives_the_same_tree(self):
+        for kind, text in DIALECTS.items():
+            with self.subTest(kind):
+                tree = cached_parse(text)
+                self.assertEqual(tree_paths(tree), EXPECTED)
+                self.assertEqual((tree.folders, tree.files), (3, 4))
+
+    def test_gnu_tree_root_marker_is_skipped(self):
+        text = ".\n├── src\n│\xa0\xa0 ├── a.py\n│\xa0\xa0 └── b.py\n└── README.md\n"
+        self.assertEqual(tree_paths(cached_parse(text)), ["src/", "src/a.py", "src/b.py", "README.md"])
+
+    def test_streaming_parser_agrees(self):
+        for kind, text in DIALECTS.items():
+            with self.subTest(kind), tempfile.TemporaryDirectory() as tmp:
+                path = write_spec(tmp, text)
+                paths = [entry.replace(os.sep, "/") + ("/" if is_folder else "")
+                         for entry, is_folder in iter_structure_file(path)]
+                self.assertEqual(paths, EXPECTED)
+
+    def test_slash_names_are_split(self):
+        tree = cached_parse("src/utils/helpers.py\nsrc/\n    main.py\n")
+        self.assertEqual(tree_paths(tree), ["src/", "src/utils/", "src/utils/helpers.py", "src/main.py"])
+
+
+if __name__ == "__main__":
+    unittest.main()
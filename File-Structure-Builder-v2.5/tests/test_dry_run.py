@@ -0,0 +1,57 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from helpers import SPEC, make_spec, write_spec
+
+from builder import build_structure, dry_run, main, plan_build
+from templates import TemplateSet
+
+
+class DryRunTest(unittest.TestCase):
+    def test_counts_for_an_empty_target(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            target = os.path.join(tmp, "new")
+            report = dry_run(target, SPEC)
+            plan = plan_build(SPEC)
+            self.assertEqual((report.mkdirs, report.creates, report.existing), (plan.dirs, plan.files, 0))
+            self.assertEqual((report.writes, report.template_bytes), (0, 0))
+            self.assertEqual(report.max_depth, 3)
+            self.assertEqual(report.max_fanout, 20)
+            self.assertEqual(report.inodes, plan.dirs + plan.files)
+            self.assertFalse(os.path.exists(target))
+
+    def test_counts_match_a_real_build(self):
+        templates = TemplateSet(project="demo")
+        with tempfile.TemporaryDirectory() as tmp:
+            build_structure(tmp, make_spec(groups=4))
+            report = dry_run(tmp, SPEC, templates)
+            result = build_structure(tmp, SPEC, templates=templates)
+            self.assertEqual((report.mkdirs, report.creates, report.existing),
+                             (result.folders, result.files, result.existing))
+            self.assertEqual(report.writes, result.files)
+            self.assertEqual(report.syscalls, report.mkdirs + report.creates + report.writes)
+
+    def test_template_bytes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            report = dry_run(tmp, "a.py\nb.md\nc.txt", TemplateSet(project="p"))
+        self.assertEqual(report.writes, 2)
+        self.assertEqual(report.template_bytes, len('"""a module of p"""\n') + len("# b\n"))
+
+    def test_cli_limit_refuses_big_builds(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            spec = write_spec(tmp, SPEC)
+            target = os.path.join(tmp, "out")
+            with contextlib.redirect_stderr(io.StringIO()):
+                self.assertEqual(main([spec, target, "--max-inodes", "10"]), 1)
+            self.assertFalse(os.path.exists(target))
+            with contextlib.redirect_stdout(io.StringIO()) as out:
+                self.assertEqual(main([spec, target, "-n"]), 0)
+            self.assertIn("mkdir:", out.getvalue())
+            self.assertFalse(os.path.exists(target))
+
+
+if __name__ == "__main__":
+    unittest.main()
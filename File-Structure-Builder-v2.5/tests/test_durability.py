@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from helpers import make_spec, snapshot
+
+import backends
+from backends import PathBackend
+from builder import Durability, build_structure
+
+SPEC = make_spec(groups=3, files=4)
+
+
+class CountingBackend(PathBackend):
+    """Records every sync the builder asks for"""
+
+    def __init__(self, syncfs: bool = True, dir_sync: bool = True):
+        super().__init__()
+        self.has_syncfs = syncfs
+        self.has_dir_sync = dir_sync
+        self.calls = {"files": 0, "dirs": 0, "syncfs": 0}
+
+    def can_syncfs(self) -> bool:
+        return self.has_syncfs
+
+    def can_fsync_dirs(self) -> bool:
+        return self.has_dir_sync
+
+    def fsync_file(self, parent, name):
+        self.calls["files"] += 1
+        super().fsync_file(parent, name)
+
+    def fsync_dir(self, handle):
+        self.calls["dirs"] += 1
+        super().fsync_dir(handle)
+
+    def syncfs(self, handle):
+        self.calls["syncfs"] += 1
+
+
+class DurabilityTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, mode, backend, workers=1):
+        self.target = os.path.join(self.tmp.name, f"out{workers}")
+        result = build_structure(self.target, SPEC, workers=workers, backend=backend, durability=mode)
+        self.assertEqual(result.files, 16)
+        return result
+
+    def test_none_never_syncs(self):
+        backend = CountingBackend()
+        result = self.build("none", backend)
+        self.assertEqual(backend.calls, {"files": 0, "dirs": 0, "syncfs": 0})
+        self.assertEqual(result.timings, {})
+
+    def test_strict_syncs_every_file_and_folder(self):
+        for workers in (1, 3):
+            with self.subTest(workers=workers):
+                backend = CountingBackend()
+                result = self.build("strict", backend, workers)
+                self.assertEqual(backend.calls["files"], 16)
+                self.assertGreaterEqual(backend.calls["dirs"], 7)
+                self.assertEqual(set(result.timings), {"files", "dirs"})
+
+    def test_batched_is_one_syncfs(self):
+        backend = CountingBackend()
+        result = self.build("batched", backend)
+        self.assertEqual(backend.calls, {"files": 0, "dirs": 0, "syncfs": 1})
+        self.assertEqual(set(result.timings), {"syncfs"})
+
+    def test_batched_without_syncfs_syncs_folders(self):
+        backend = CountingBackend(syncfs=False)
+        self.build("batched", backend)
+        self.assertEqual(backend.calls["files"], 0)
+        self.assertEqual(backend.calls["syncfs"], 0)
+        self.assertGreaterEqual(backend.calls["dirs"], 7)
+
+    def test_batched_on_windows_syncs_files(self):
+        backend = CountingBackend(syncfs=False, dir_sync=False)
+        self.build("batched", backend)
+        self.assertEqual(backend.calls["files"], 16)
+        self.assertEqual(backend.calls["syncfs"], 0)
+        self.assertEqual(len(snapshot(self.target)), 22)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            Durability("paranoid", PathBackend())
+
+    def test_files_are_synced_through_a_writable_handle(self):
+        path = os.path.join(self.tmp.name, "f.txt")
+        with open(path, "wb"):
+            pass
+        with mock.patch.object(backends.os, "open", wraps=os.open) as opened:
+            backends.fsync_path(path, is_folder=False)
+            backends.fsync_path(self.tmp.name)
+        file_flags = opened.call_args_list[0][0][1]
+        folder_flags = opened.call_args_list[1][0][1]
+        self.assertTrue(file_flags & os.O_WRONLY)
+        self.assertFalse(folder_flags & (os.O_WRONLY | os.O_RDWR))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import random
+import unittest
+
+import helpers  # noqa: F401  (puts the app on sys.path)
+
+from structure_parser import IncrementalParser, parse_structure
+
+TREE_SPEC = (
+    "my-app/\n"
+    "├── src/\n"
+    "│   ├── components/\n"
+    "│   │   └── Header.jsx\n"
+    "│   └── index.js\n"
+    "└── package.json\n"
+)
+
+
+def paths(tree):
+    return [node.path() for node in tree.trie().walk()]
+
+
+class IncrementalParserTest(unittest.TestCase):
+    def assert_same_as_full_parse(self, parser, text):
+        full = parse_structure(text, parser.dialect)
+        self.assertEqual((parser.folders, parser.files), (full.folders, full.files))
+        self.assertEqual(paths(parser.tree()), paths(full))
+
+    def test_replacing_a_line_range(self):
+        parser = IncrementalParser(TREE_SPEC)
+        lines = TREE_SPEC.split("\n")
+        lines[3:4] = ["│   │   ├── Header.jsx", "│   │   └── Footer.jsx"]
+        parser.update(3, 4, lines[3:5])
+        self.assert_same_as_full_parse(parser, "\n".join(lines))
+
+    def test_random_edits_of_a_long_spec(self):
+        rng = random.Random(4)
+        lines = [f"{'    ' * (index % 3)}entry{index}{'/' if index % 3 < 2 else '.txt'}" for index in range(600)]
+        parser = IncrementalParser("\n".join(lines))
+        for _ in range(200):
+            start = rng.randrange(len(lines))
+            stop = min(len(lines), start + rng.randrange(3))
+            new_lines = [f"{'    ' * rng.randrange(3)}edit{rng.randrange(1000)}{rng.choice(['/', '.py', ''])}"
+                         for _ in range(rng.randrange(3))]
+            lines[start:stop] = new_lines
+            parser.update(start, stop, new_lines)
+        self.assert_same_as_full_parse(parser, "\n".join(lines))
+        self.assertTrue(parser.matches("\n".join(lines)))
+
+    def test_matches_spots_a_missed_edit(self):
+        parser = IncrementalParser(TREE_SPEC)
+        self.assertTrue(parser.matches(TREE_SPEC))
+        self.assertFalse(parser.matches(TREE_SPEC.replace("index.js", "main.js")))
+        self.assertFalse(parser.matches(TREE_SPEC + "extra.txt\n"))
+        # An update with the wrong range no longer matches the widget text
+        parser.update(1, 2, ["├── lib/"])
+        self.assertFalse(parser.matches(TREE_SPEC))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from helpers import SPEC, snapshot
+
+from backends import PathBackend
+from builder import build_structure, execute_plan, open_journal, plan_build, resume_build
+from journal import JOURNAL_NAME
+
+
+class FailingBackend(PathBackend):
+    """Dies after a number of files, like a build that gets killed"""
+
+    def __init__(self, files_left: int):
+        super().__init__()
+        self.files_left = files_left
+
+    def create_file(self, parent, name: str, data: bytes = b'') -> bool:
+        if self.files_left == 0:
+            raise OSError("simulated crash")
+        self.files_left -= 1
+        return super().create_file(parent, name, data)
+
+
+class JournalResumeTest(unittest.TestCase):
+    def interrupted_build(self, target: str, workers: int):
+        plan = plan_build(SPEC)
+        journal = open_journal(target, plan, every=10)
+        with self.assertRaises(OSError):
+            execute_plan(target, plan, FailingBackend(100), workers=workers, journal=journal)
+        self.assertTrue(os.path.exists(os.path.join(target, JOURNAL_NAME)))
+
+    def test_journaled_build_leaves_no_journal(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            build_structure(tmp, SPEC, journal=True)
+            self.assertFalse(os.path.exists(os.path.join(tmp, JOURNAL_NAME)))
+
+    def test_resume_finishes_the_build(self):
+        for workers in (1, 3):
+            with self.subTest(workers=workers), tempfile.TemporaryDirectory() as tmp:
+                target = os.path.join(tmp, "resumed")
+                self.interrupted_build(target, workers)
+                result = resume_build(target, SPEC, workers=workers, every=10)
+                self.assertGreater(result.existing, 0)
+                self.assertEqual(result.total, len(plan_build(SPEC).order))
+                self.assertFalse(os.path.exists(os.path.join(target, JOURNAL_NAME)))
+
+                reference = os.path.join(tmp, "reference")
+                build_structure(reference, SPEC)
+                self.assertEqual(snapshot(target), snapshot(reference))
+
+    def test_journal_marked_complete_but_not_removed(self):
+        plan = plan_build(SPEC)
+        total = len(plan.order)
+        with tempfile.TemporaryDirectory() as tmp:
+            build_structure(tmp, SPEC)
+            # The process died right after its final mark
+            journal = open_journal(tmp, plan, every=total)
+            journal.start("i")
+            journal.mark(total)
+            journal.close()
+            result = resume_build(tmp, SPEC, every=total)
+            self.assertEqual(result.existing, total)
+            self.assertFalse(os.path.exists(os.path.join(tmp, JOURNAL_NAME)))
+
+    def test_journal_of_another_spec_is_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.interrupted_build(tmp, 1)
+            result = resume_build(tmp, "other/\n    file.txt", every=10)
+            self.assertEqual((result.folders, result.files), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from helpers import SPEC
+
+from backends import MemoryBackend
+from builder import execute_plan, plan_build, preview_structure
+
+
+class MemoryBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.backend = MemoryBackend()
+        self.result = execute_plan("project", plan_build("src/\n    app.py\nREADME.md"), self.backend)
+
+    def test_build_lands_in_memory(self):
+        self.assertEqual((self.result.folders, self.result.files), (1, 2))
+        self.assertTrue(self.backend.exists("project/src/app.py"))
+        self.assertFalse(self.backend.exists("project/src/missing.py"))
+        self.assertEqual(self.backend.read("project/README.md"), b'')
+
+    def test_walk_is_parents_first(self):
+        self.assertEqual(list(self.backend.walk("project")), [
+            (1, "src", True),
+            (2, "app.py", False),
+            (1, "README.md", False),
+        ])
+
+    def test_read_errors(self):
+        with self.assertRaises(IsADirectoryError):
+            self.backend.read("project/src")
+        with self.assertRaises(FileNotFoundError):
+            self.backend.read("project/nope.txt")
+
+    def test_rebuild_only_finds_existing_entries(self):
+        again = execute_plan("project", plan_build("src/\n    app.py\n    extra.py"), self.backend)
+        self.assertEqual((again.folders, again.files, again.existing), (0, 1, 2))
+
+    def test_file_in_the_way_of_a_folder(self):
+        with self.assertRaises(FileExistsError):
+            execute_plan("project", plan_build("README.md/\n    inner.txt"), self.backend)
+
+
+class PreviewTest(unittest.TestCase):
+    def test_preview_matches_a_memory_build(self):
+        backend = MemoryBackend()
+        built = execute_plan("", plan_build(SPEC), backend)
+        result, lines = preview_structure(SPEC, limit=5)
+        self.assertEqual((result.folders, result.files), (built.folders, built.files))
+        expected = [f"{'    ' * (depth - 1)}{'📁' if is_folder else '📄'} {name}{'/' if is_folder else ''}"
+                    for depth, name, is_folder in list(backend.walk())[:5]]
+        self.assertEqual(lines, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from helpers import SPEC, snapshot
+
+from backends import MemoryBackend
+from builder import MAX_OPEN_HANDLES, build_structure, execute_plan, plan_build
+from templates import TemplateSet
+
+
+class ThreadedEngineTest(unittest.TestCase):
+    def test_memory_serial_and_threaded_agree(self):
+        plan = plan_build(SPEC)
+        serial, threaded = MemoryBackend(), MemoryBackend()
+        first = execute_plan("", plan, serial)
+        second = execute_plan("", plan, threaded, workers=4)
+        self.assertEqual(list(serial.walk()), list(threaded.walk()))
+        self.assertEqual((first.folders, first.files), (second.folders, second.files))
+        self.assertEqual(first.total, len(plan.order))
+
+    def test_disk_serial_and_threaded_agree(self):
+        templates = TemplateSet(project="demo")
+        with tempfile.TemporaryDirectory() as serial, tempfile.TemporaryDirectory() as threaded:
+            first = build_structure(serial, SPEC, templates=templates)
+            second = build_structure(threaded, SPEC, templates=templates, workers=4)
+            self.assertEqual(snapshot(serial), snapshot(threaded))
+            self.assertEqual((first.folders, first.files), (second.folders, second.files))
+
+    def test_second_build_only_finds_existing_entries(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            build_structure(tmp, SPEC)
+            for workers in (1, 4):
+                result = build_structure(tmp, SPEC, workers=workers)
+                self.assertEqual((result.folders, result.files), (0, 0))
+                self.assertEqual(result.existing, len(plan_build(SPEC).order))
+
+    def test_wide_level(self):
+        # More sibling folders than the threaded engine keeps fds open for
+        spec = "\n".join(f"d{index}/\n    x/" for index in range(MAX_OPEN_HANDLES * 2))
+        with tempfile.TemporaryDirectory() as tmp:
+            result = build_structure(tmp, spec, workers=4)
+            self.assertEqual(result.folders, MAX_OPEN_HANDLES * 4)
+            self.assertTrue(os.path.isdir(os.path.join(tmp, "d7", "x")))
+
+    def test_error_in_a_worker_stops_the_build(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "pkg3"), "w"):
+                pass
+            with self.assertRaises(OSError):
+                build_structure(tmp, SPEC, workers=4)
+            # Nothing below the failed level was started
+            self.assertFalse(os.path.exists(os.path.join(tmp, "pkg0", "sub", "mod0.py")))
+
+
+if __name__ == "__main__":
+    unittest.main()
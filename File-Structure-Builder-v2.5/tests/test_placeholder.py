@@ -0,0 +1,54 @@
+import errno
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import helpers  # noqa: F401  (puts the app on sys.path)
+
+import backends
+from backends import create_placeholder, write_new_file
+
+
+class PlaceholderTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "empty.txt")
+        self.use_mknod = backends._use_mknod
+
+    def tearDown(self):
+        backends._use_mknod = self.use_mknod
+        self.tmp.cleanup()
+
+    def test_creates_an_empty_file_once(self):
+        self.assertTrue(create_placeholder(self.path))
+        self.assertEqual(os.path.getsize(self.path), 0)
+        self.assertFalse(create_placeholder(self.path))
+
+    def test_refused_mknod_falls_back_to_open(self):
+        for code in (errno.EPERM, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL):
+            with self.subTest(errno=errno.errorcode[code]):
+                backends._use_mknod = True
+                path = os.path.join(self.tmp.name, f"file{code}")
+                with mock.patch.object(backends.os, "mknod", side_effect=OSError(code, os.strerror(code)),
+                                       create=True):
+                    self.assertTrue(create_placeholder(path))
+                self.assertTrue(os.path.isfile(path))
+                self.assertFalse(backends._use_mknod)
+
+    def test_other_errors_still_raise(self):
+        backends._use_mknod = True
+        with mock.patch.object(backends.os, "mknod", side_effect=OSError(errno.ENOSPC, "full"), create=True):
+            with self.assertRaises(OSError):
+                create_placeholder(self.path)
+        self.assertTrue(backends._use_mknod)
+
+    def test_write_new_file(self):
+        self.assertTrue(write_new_file(self.path, b"hello"))
+        self.assertFalse(write_new_file(self.path, b"other"))
+        with open(self.path, "rb") as handle:
+            self.assertEqual(handle.read(), b"hello")
+
+
+if __name__ == "__main__":
+    unittest.main()
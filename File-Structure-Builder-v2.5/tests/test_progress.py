@@ -0,0 +1,58 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from helpers import SPEC, make_spec
+
+from builder import build_events, build_structure, build_structure_async, plan_build
+
+TOTAL = len(plan_build(SPEC).order)
+# Big enough for the engines to report more than once
+BIG_SPEC = make_spec(groups=30, files=40)
+
+
+class ProgressTest(unittest.TestCase):
+    def check_events(self, events, result, total=TOTAL):
+        self.assertEqual((events[-1].done, events[-1].total), (result.total, total))
+        self.assertEqual(events[-1].fraction, 1.0)
+        self.assertEqual((events[-1].folders, events[-1].files), (result.folders, result.files))
+        self.assertIsNone(events[-1].error)
+        self.assertEqual([event.done for event in events], sorted(event.done for event in events))
+
+    def test_progress_ends_on_the_totals(self):
+        for options in ({}, {"workers": 4}, {"processes": 2}):
+            with self.subTest(**options), tempfile.TemporaryDirectory() as tmp:
+                events = []
+                result = build_structure(tmp, BIG_SPEC, progress=events.append, **options)
+                self.assertGreater(len(events), 1)
+                self.check_events(events, result, len(plan_build(BIG_SPEC).order))
+
+    def test_async_progress(self):
+        events = []
+        with tempfile.TemporaryDirectory() as tmp:
+            result = asyncio.run(build_structure_async(tmp, SPEC, concurrency=4, progress=events.append))
+        self.check_events(events, result)
+
+    def test_build_events_iterates_the_build(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            events = list(build_events(tmp, SPEC, workers=2))
+            self.assertTrue(os.path.isfile(os.path.join(tmp, "README.md")))
+        self.assertEqual(events[-1].done, TOTAL)
+        self.assertIsNone(events[-1].error)
+
+    def test_failed_build_ends_on_an_error_event(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # A file where the spec wants its first folder
+            with open(os.path.join(tmp, "pkg0"), "w"):
+                pass
+            events = []
+            with self.assertRaises(OSError):
+                for event in build_events(tmp, SPEC):
+                    events.append(event)
+        self.assertIsInstance(events[-1].error, OSError)
+        self.assertLess(events[-1].done, TOTAL)
+
+
+if __name__ == "__main__":
+    unittest.main()
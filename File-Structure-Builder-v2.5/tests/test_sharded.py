@@ -0,0 +1,45 @@
+import tempfile
+import unittest
+
+from helpers import SPEC, snapshot
+
+from builder import _subtree_sizes, build_structure, encode_shard, plan_build, shard_plan
+from templates import TemplateSet
+
+
+class ShardPlanTest(unittest.TestCase):
+    def test_groups_cover_the_plan_once(self):
+        plan = plan_build(SPEC)
+        sizes = _subtree_sizes(plan)
+        expanded, groups = shard_plan(plan, 3)
+        self.assertEqual(len(groups), 3)
+        covered = len(expanded) + sum(sizes[node] for group in groups for node in group)
+        self.assertEqual(covered, len(plan.order))
+        # Greedy packing keeps the shards within one subtree of each other
+        loads = [sum(sizes[node] for node in group) for group in groups]
+        self.assertLessEqual(max(loads) - min(loads), max(sizes[node] for group in groups for node in group))
+
+    def test_encoded_shard(self):
+        plan = plan_build("a/\n    b/\n        c.txt\n    d.txt")
+        top = plan.trie.root.children["a"]
+        self.assertEqual(encode_shard([top]).decode(), "0\tR\t\n1\tD\ta\n2\tD\tb\n3\tF\tc.txt\n2\tF\td.txt")
+
+
+class ShardedBuildTest(unittest.TestCase):
+    def test_matches_the_serial_build(self):
+        templates = TemplateSet(project="demo")
+        with tempfile.TemporaryDirectory() as serial, tempfile.TemporaryDirectory() as sharded:
+            first = build_structure(serial, SPEC, templates=templates)
+            second = build_structure(sharded, SPEC, templates=templates, processes=2)
+            self.assertEqual(snapshot(serial), snapshot(sharded))
+            self.assertEqual((first.folders, first.files), (second.folders, second.files))
+
+    def test_refuses_what_shards_cannot_do(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for options in ({"durability": "strict"}, {"journal": True}, {"low_priority": True}):
+                with self.subTest(**options), self.assertRaises(ValueError):
+                    build_structure(tmp, SPEC, processes=2, **options)
+
+
+if __name__ == "__main__":
+    unittest.main()
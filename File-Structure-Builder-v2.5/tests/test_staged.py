@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from helpers import SPEC
+
+import builder
+from builder import build_staged, plan_build
+
+
+class StagedBuildTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.target = os.path.join(self.tmp.name, "project")
+        os.mkdir(self.target)
+        with open(os.path.join(self.target, "old.txt"), "w") as handle:
+            handle.write("old")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def assert_no_leftovers(self):
+        self.assertEqual(os.listdir(self.tmp.name), ["project"])
+
+    def test_swap_replaces_the_target(self):
+        result = build_staged(self.target, SPEC, workers=2)
+        self.assertEqual(result.total, len(plan_build(SPEC).order))
+        self.assertNotIn("old.txt", os.listdir(self.target))
+        self.assertTrue(os.path.isfile(os.path.join(self.target, "README.md")))
+        self.assert_no_leftovers()
+
+    def test_swap_without_rename_exchange(self):
+        with mock.patch.object(builder, "exchange_paths", return_value=False):
+            build_staged(self.target, SPEC)
+        self.assertNotIn("old.txt", os.listdir(self.target))
+        self.assertTrue(os.path.isfile(os.path.join(self.target, "README.md")))
+        self.assert_no_leftovers()
+
+    def test_new_target(self):
+        fresh = os.path.join(self.tmp.name, "fresh")
+        build_staged(fresh, "a.txt")
+        self.assertEqual(os.listdir(fresh), ["a.txt"])
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["fresh", "project"])
+
+    def test_failed_build_leaves_the_target_alone(self):
+        with mock.patch.object(builder, "execute_plan", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                build_staged(self.target, SPEC)
+        self.assertEqual(os.listdir(self.target), ["old.txt"])
+        self.assert_no_leftovers()
+
+    def test_failed_publish_puts_the_old_tree_back(self):
+        real_rename = os.rename
+        calls = []
+
+        def rename(src, dst):
+            calls.append(src)
+            # Second rename is staging -> target, after the old tree moved aside
+            if len(calls) == 2:
+                raise OSError("rename failed")
+            real_rename(src, dst)
+
+        with mock.patch.object(builder, "exchange_paths", return_value=False), \
+                mock.patch.object(builder.os, "rename", side_effect=rename):
+            with self.assertRaises(OSError):
+                build_staged(self.target, SPEC)
+        self.assertEqual(os.listdir(self.target), ["old.txt"])
+        self.assert_no_leftovers()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from helpers import SPEC
+
+from builder import sync_structure
+from manifest import MANIFEST_NAME, Manifest
+
+
+class SyncTest(unittest.TestCase):
+    def test_second_sync_creates_nothing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = sync_structure(tmp, SPEC)
+            self.assertTrue(os.path.exists(os.path.join(tmp, MANIFEST_NAME)))
+            second = sync_structure(tmp, SPEC)
+            self.assertEqual((second.folders, second.files), (0, 0))
+            self.assertEqual(second.existing, first.total)
+
+    def test_reformatted_spec_keeps_the_digest(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sync_structure(tmp, "app/\n    main.py  # entry point\n")
+            digest = Manifest.load(tmp).digest
+            result = sync_structure(tmp, "app/\n└── main.py\n")
+            self.assertEqual(Manifest.load(tmp).digest, digest)
+            self.assertEqual(result.existing, 2)
+
+    def test_only_new_entries_are_created(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sync_structure(tmp, "app/\n    main.py")
+            result = sync_structure(tmp, "app/\n    main.py\n    util.py\ndocs/")
+            self.assertEqual((result.folders, result.files, result.existing), (1, 1, 2))
+            self.assertTrue(os.path.isfile(os.path.join(tmp, "app", "util.py")))
+
+    def test_remove_drops_only_untouched_entries(self):
+        old_spec = "app/\n    keep.py\n    gone.py\n    edited.py\n    old/\n        inner.txt\nnotes.txt"
+        new_spec = "app/\n    keep.py\nnotes.txt"
+        with tempfile.TemporaryDirectory() as tmp:
+            sync_structure(tmp, old_spec)
+            edited = os.path.join(tmp, "app", "edited.py")
+            with open(edited, "w") as handle:
+                handle.write("print('mine')\n")
+            # Make sure the mtime moves even on coarse filesystem clocks
+            stat = os.stat(edited)
+            os.utime(edited, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+            result = sync_structure(tmp, new_spec, remove=True)
+            self.assertEqual(result.removed, 3)
+            self.assertFalse(os.path.exists(os.path.join(tmp, "app", "gone.py")))
+            self.assertFalse(os.path.exists(os.path.join(tmp, "app", "old")))
+            self.assertTrue(os.path.exists(edited))
+            self.assertTrue(os.path.exists(os.path.join(tmp, "app", "keep.py")))
+
+    def test_replaced_entry_is_not_removed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sync_structure(tmp, "a.txt\nb.txt")
+            path = os.path.join(tmp, "b.txt")
+            os.unlink(path)
+            # Same name, new inode: not the file the manifest recorded
+            os.mkdir(path)
+            result = sync_structure(tmp, "a.txt", remove=True)
+            self.assertEqual(result.removed, 0)
+            self.assertTrue(os.path.isdir(path))
+
+    def test_without_remove_nothing_is_deleted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sync_structure(tmp, "a.txt\nb.txt")
+            result = sync_structure(tmp, "a.txt")
+            self.assertEqual(result.removed, 0)
+            self.assertTrue(os.path.exists(os.path.join(tmp, "b.txt")))
+
+
+if __name__ == "__main__":
+    unittest.main()
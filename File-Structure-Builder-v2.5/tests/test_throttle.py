@@ -0,0 +1,106 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from helpers import SPEC, snapshot
+
+import throttle
+from builder import build_structure, plan_build
+from throttle import RateLimiter, TokenBucket, run_in_thread
+
+
+def timed(func, *args):
+    start = time.monotonic()
+    func(*args)
+    return time.monotonic() - start
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_zero_rate_is_unlimited(self):
+        bucket = TokenBucket(0)
+        self.assertLess(timed(lambda: [bucket.take() for _ in range(10000)]), 0.5)
+
+    def test_takes_are_paced_to_the_rate(self):
+        bucket = TokenBucket(200, burst=1)
+        # The first take spends the full bucket, the other 20 wait 1/200 s each
+        elapsed = timed(lambda: [bucket.take() for _ in range(21)])
+        self.assertGreaterEqual(elapsed, 0.09)
+        self.assertLess(elapsed, 1.0)
+
+    def test_concurrent_takers_share_the_rate(self):
+        bucket = TokenBucket(200, burst=1)
+        bucket.take()
+        threads = [threading.Thread(target=lambda: [bucket.take() for _ in range(5)]) for _ in range(4)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_set_rate_lifts_the_cap(self):
+        bucket = TokenBucket(5, burst=1)
+        bucket.take()
+        bucket.set_rate(0)
+        self.assertLess(timed(lambda: [bucket.take() for _ in range(1000)]), 0.5)
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_set_limits_during_a_running_build(self):
+        limiter = RateLimiter(ops_per_sec=20)
+        results = []
+        with tempfile.TemporaryDirectory() as tmp:
+            target = os.path.join(tmp, "out")
+            thread = threading.Thread(target=lambda: results.append(
+                build_structure(target, SPEC, workers=3, limiter=limiter)))
+            thread.start()
+            # At 20 ops/s the whole spec would take well over ten seconds
+            time.sleep(0.3)
+            self.assertTrue(thread.is_alive())
+            limiter.set_limits(ops_per_sec=0)
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+            self.assertEqual(results[0].total, len(plan_build(SPEC).order))
+
+            reference = os.path.join(tmp, "reference")
+            build_structure(reference, SPEC)
+            self.assertEqual(snapshot(target), snapshot(reference))
+
+    def test_none_leaves_a_cap_alone(self):
+        limiter = RateLimiter(ops_per_sec=10, bytes_per_sec=1000)
+        limiter.set_limits(bytes_per_sec=0)
+        self.assertEqual((limiter.ops.rate, limiter.bytes.rate), (10, 0))
+
+
+class LowPriorityTest(unittest.TestCase):
+    def test_caller_thread_keeps_its_priority(self):
+        lowered_on = []
+
+        def record():
+            lowered_on.append(threading.get_ident())
+            return False
+
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(throttle, "lower_priority", side_effect=record):
+            build_structure(tmp, SPEC, workers=3, low_priority=True)
+        self.assertTrue(lowered_on)
+        self.assertNotIn(threading.get_ident(), lowered_on)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "per-thread nice is Linux only")
+    def test_real_lowering_stays_on_the_build_threads(self):
+        before = os.getpriority(os.PRIO_PROCESS, threading.get_native_id())
+        with tempfile.TemporaryDirectory() as tmp:
+            build_structure(tmp, SPEC, low_priority=True)
+        self.assertEqual(os.getpriority(os.PRIO_PROCESS, threading.get_native_id()), before)
+
+    def test_run_in_thread(self):
+        self.assertNotEqual(run_in_thread(threading.get_ident), threading.get_ident())
+        with self.assertRaises(KeyError):
+            run_in_thread({}.__getitem__, "missing")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import io
+import os
+import tempfile
+import unittest
+
+from helpers import snapshot
+
+from builder import build_structure, build_structure_stream
+from structure_parser import cached_parse
+
+
+def trie_paths(text):
+    return [node.path().replace(os.sep, "/") + ("/" if node.is_folder else "")
+            for node in cached_parse(text).trie().walk()]
+
+
+class TrieTest(unittest.TestCase):
+    def test_duplicates_merge(self):
+        self.assertEqual(trie_paths("src/\n    a.py\nsrc/\n    a.py\n    b.py"), ["src/", "src/a.py", "src/b.py"])
+
+    def test_file_with_children_becomes_a_folder(self):
+        trie = cached_parse("lib\n    util.py\nlib/").trie()
+        self.assertEqual((trie.folders, trie.files), (1, 1))
+
+    def test_segments_are_interned(self):
+        trie = cached_parse("a/\n    src/\nb/\n    src/").trie()
+        first, second = [node for node in trie.walk() if node.name == "src"]
+        self.assertIs(first.name, second.name)
+
+    def test_empty_names_are_skipped(self):
+        for text in ("a/\n/\nb.txt", "src/\n├── /\n└── x.py", "x/\n    /\n        y.txt", "a//b.txt\n//"):
+            with self.subTest(text=text):
+                paths = trie_paths(text)
+                self.assertNotIn("", [path.rstrip("/").rsplit("/", 1)[-1] for path in paths])
+
+    def test_empty_name_builds_like_the_streaming_path(self):
+        text = "x/\n    /\n        y.txt\n/\nz.txt"
+        with tempfile.TemporaryDirectory() as planned, tempfile.TemporaryDirectory() as streamed:
+            build_structure(planned, text, workers=2)
+            build_structure_stream(streamed, io.StringIO(text))
+            self.assertEqual(snapshot(planned), snapshot(streamed))
+            self.assertIn(os.path.join("x", "y.txt"), snapshot(planned))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,232 @@
+import os
+import platform
+import sys
+import threading
+import time
+
+from backends import Backend
+
+try:
+    import ctypes
+    _libc = ctypes.CDLL(None, use_errno=True)
+except (ImportError, OSError, TypeError):
+    _libc = None
+
+_kernel32 = None
+if sys.platform == "win32":
+    try:
+        _kernel32 = ctypes.WinDLL("kernel32")
+        _kernel32.GetCurrentThread.restype = ctypes.c_void_p
+        _kernel32.SetThreadPriority.argtypes = [ctypes.c_void_p, ctypes.c_int]
+    except (NameError, OSError, AttributeError):
+        _kernel32 = None
+
+# ioprio_set has no libc wrapper, so it goes through syscall(2) by number
+IOPRIO_SET_SYSCALLS = {
+    "x86_64": 251,
+    "i686": 289,
+    "aarch64": 30,
+    "riscv64": 30,
+    "armv7l": 314,
+}
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+LOW_NICE = 19
+# Windows: low CPU, I/O and memory priority for the calling thread only
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+# macOS setiopolicy_np(): throttled disk I/O for the calling thread
+IOPOL_TYPE_DISK = 0
+IOPOL_SCOPE_THREAD = 1
+IOPOL_THROTTLE = 3
+
+
+def lower_priority() -> bool:
+    """
+    Put the calling thread in the idle I/O class and at the lowest CPU
+    priority; False where the platform can't lower a single thread
+
+    Only ever the calling thread: an unprivileged process can't raise a
+    priority again, so every thread doing build work has to call this
+    itself, and none of them should be a thread the caller keeps using
+    (see run_in_thread).
+    """
+    lowered = False
+    if sys.platform.startswith("linux"):
+        number = IOPRIO_SET_SYSCALLS.get(platform.machine())
+        if _libc is not None and number is not None:
+            # who=0: the calling thread
+            lowered = _libc.syscall(number, IOPRIO_WHO_PROCESS, 0,
+                                    IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) == 0
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), LOW_NICE)
+            lowered = True
+        except OSError:
+            pass
+    elif _kernel32 is not None:
+        lowered = bool(_kernel32.SetThreadPriority(_kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN))
+    elif sys.platform == "darwin" and hasattr(_libc, "setiopolicy_np"):
+        lowered = _libc.setiopolicy_np(IOPOL_TYPE_DISK, IOPOL_SCOPE_THREAD, IOPOL_THROTTLE) == 0
+    # os.nice() would lower the whole process for good, so other platforms stay as they are
+    return lowered
+
+
+def run_in_thread(func, *args, **kwargs):
+    """
+    Call ``func`` on a thread of its own and wait for its result
+
+    Low-priority builds run this way, so the thread that gets lowered is
+    one that ends with the build and never the caller's.
+    """
+    outcome = []
+
+    def run():
+        try:
+            outcome.append((True, func(*args, **kwargs)))
+        except BaseException as error:
+            outcome.append((False, error))
+
+    thread = threading.Thread(target=run, name="low-priority-build", daemon=True)
+    thread.start()
+    thread.join()
+    finished, value = outcome[0]
+    if not finished:
+        raise value
+    return value
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket; a rate of 0 means unlimited
+
+    Takers that run the bucket dry go into debt and sleep it off outside
+    the lock, so concurrent callers are paced to the rate between them.
+    """
+    __slots__ = ("rate", "burst", "tokens", "stamp", "_lock")
+
+    def __init__(self, rate: float = 0, burst: float = None):
+        self._lock = threading.Lock()
+        self.rate = 0
+        self.burst = 0
+        self.tokens = 0.0
+        self.stamp = time.monotonic()
+        self.set_rate(rate, burst)
+        # Start full, so short bursts are not held back
+        self.tokens = self.burst
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def set_rate(self, rate: float, burst: float = None):
+        """Change the rate; safe to call while other threads are taking"""
+        with self._lock:
+            now = time.monotonic()
+            if self.rate:
+                self._refill(now)
+            self.rate = max(0, rate)
+            # One second's worth by default
+            self.burst = burst if burst is not None else max(1, self.rate)
+            self.tokens = min(self.tokens, self.burst)
+            self.stamp = now
+
+    def take(self, amount: float = 1):
+        with self._lock:
+            if not self.rate:
+                return
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """Operations per second and bytes per second for a build (0 = no cap)"""
+    __slots__ = ("ops", "bytes")
+
+    def __init__(self, ops_per_sec: float = 0, bytes_per_sec: float = 0):
+        self.ops = TokenBucket(ops_per_sec)
+        self.bytes = TokenBucket(bytes_per_sec)
+
+    def set_limits(self, ops_per_sec: float = None, bytes_per_sec: float = None):
+        """Adjust the caps of a running build; None leaves a cap as it is"""
+        if ops_per_sec is not None:
+            self.ops.set_rate(ops_per_sec)
+        if bytes_per_sec is not None:
+            self.bytes.set_rate(bytes_per_sec)
+
+    def acquire(self, nbytes: int = 0):
+        self.ops.take(1)
+        if nbytes:
+            self.bytes.take(nbytes)
+
+
+class ThrottledBackend(Backend):
+    """
+    Wraps another backend and paces every filesystem call through a
+    RateLimiter; with ``low_priority`` each thread that builds through
+    it is lowered the first time it does so
+    """
+
+    def __init__(self, backend, limiter: RateLimiter = None, low_priority: bool = False):
+        self.backend = backend
+        self.limiter = limiter or RateLimiter()
+        self.low_priority = low_priority
+        self._lowered = threading.local()
+
+    def _pace(self, nbytes: int = 0):
+        if self.low_priority and not getattr(self._lowered, "done", False):
+            lower_priority()
+            self._lowered.done = True
+        self.limiter.acquire(nbytes)
+
+    def open_root(self, base_path: str):
+        self._pace()
+        return self.backend.open_root(base_path)
+
+    def mkdir(self, parent, name: str):
+        self._pace()
+        return self.backend.mkdir(parent, name)
+
+    def create_file(self, parent, name: str, data: bytes = b'') -> bool:
+        self._pace(len(data))
+        return self.backend.create_file(parent, name, data)
+
+    def open_dir(self, parent, name: str):
+        self._pace()
+        return self.backend.open_dir(parent, name)
+
+    def listdir(self, handle):
+        self._pace()
+        return self.backend.listdir(handle)
+
+    def fsync_file(self, parent, name: str):
+        self._pace()
+        self.backend.fsync_file(parent, name)
+
+    def fsync_dir(self, handle):
+        self._pace()
+        self.backend.fsync_dir(handle)
+
+    def can_fsync_dirs(self) -> bool:
+        return self.backend.can_fsync_dirs()
+
+    def can_syncfs(self) -> bool:
+        return self.backend.can_syncfs()
+
+    def syncfs(self, handle):
+        self._pace()
+        self.backend.syncfs(handle)
+
+    def release(self, handle):
+        self.backend.release(handle)
+
+    def path_handles(self):
+        backend = self.backend.path_handles()
+        if backend is self.backend:
+            return self
+        return ThrottledBackend(backend, self.limiter, self.low_priority)
+
+    def close(self):
+        self.backend.close()
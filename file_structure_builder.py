@@ -5,6 +5,9 @@ import platform
 import re
 from pathlib import Path
 
+# Flags for creating an empty placeholder file with a single os.open
+EMPTY_FILE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
 class FileStructureBuilder:
     def __init__(self, root):
         self.root = root
@@ -238,6 +241,8 @@ class FileStructureBuilder:
             
             created_folders = 0
             created_files = 0
+            # Directories already made, so each one costs a single makedirs
+            ready_dirs = set()
             
             # Create structure
             for item_path, is_folder in structure:
@@ -245,18 +250,20 @@ class FileStructureBuilder:
                 
                 try:
                     if is_folder:
-                        os.makedirs(full_path, exist_ok=True)
+                        if full_path not in ready_dirs:
+                            os.makedirs(full_path, exist_ok=True)
+                            ready_dirs.add(full_path)
                         self.output_text.insert(tk.END, f"✅ Created folder: {item_path}\n")
                         created_folders += 1
                     else:
                         # Create parent directories if needed
                         parent_dir = os.path.dirname(full_path)
-                        if parent_dir:
+                        if parent_dir and parent_dir not in ready_dirs:
                             os.makedirs(parent_dir, exist_ok=True)
+                            ready_dirs.add(parent_dir)
                         
-                        # Create empty file
-                        with open(full_path, 'w', encoding='utf-8') as f:
-                            f.write("")
+                        # Create (or truncate) an empty file without a Python file object
+                        os.close(os.open(full_path, EMPTY_FILE_FLAGS, 0o666))
                         self.output_text.insert(tk.END, f"📄 Created file: {item_path}\n")
                         created_files += 1
                         